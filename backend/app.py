@@ -2,15 +2,27 @@
 Main Flask application for Doc Locker - Smart Document Vault.
 """
 import os
+import sys
 from flask import Flask, jsonify, request, make_response, g, session
 from flask_cors import CORS
 from config import Config
 import google.generativeai as genai
-from models import db, User
+from models import db, User, Document
 from routes.auth_routes import auth_bp
-from routes.student_routes import student_bp
+from routes.student_routes import student_bp, refresh_user_profile, resume_pending_documents
 from routes.admin_routes import admin_bp
 from utils.jwt_utils import token_required, create_access_token, decode_token
+from utils.job_queue import JobQueue
+from utils.profile_scheduler import ProfileScheduler
+from utils.storage import send_stored_file, stored_relpath, BLOB_DIR
+from utils.user_stats import init_user_stats, rebuild_user_stats
+from utils.search import init_search_index, rebuild_search_index
+from utils.schema_capabilities import SchemaCapabilities
+from utils.activity import ActivityTracker
+from utils.db_pool import PoolMetrics
+from utils.metrics import REGISTRY, init_request_metrics
+from utils.sql_profiler import SQLProfiler
+from utils.llm import LLMClient
 from functools import wraps
 from datetime import datetime, timedelta
 
@@ -29,6 +41,16 @@ def create_app():
     
     # Initialize extensions
     db.init_app(app)
+    schema = SchemaCapabilities(app, db)
+    pool_metrics = PoolMetrics(app, db)
+    init_user_stats()
+    JobQueue(app)
+    ProfileScheduler(app, runner=refresh_user_profile)
+    activity = ActivityTracker(app)
+    init_request_metrics(app)
+    SQLProfiler(app, db)
+    LLMClient(app)
+    register_gauges(app, pool_metrics)
     
     # CORS configuration
     CORS(
@@ -58,29 +80,44 @@ def create_app():
     app.register_blueprint(student_bp)
     app.register_blueprint(admin_bp)
 
-    # Middleware: set g.user and update last_active on authenticated requests
+    # Middleware: record last_active for authenticated requests (written behind in batches)
     @app.before_request
     def load_current_user_and_touch_last_active():
-        try:
-            user_id = session.get('user_id')
-            if not user_id:
-                g.user = None
-                return
-            user = User.query.get(user_id)
-            g.user = user
-            if user:
-                user.last_active = datetime.utcnow()
-                db.session.commit()
-        except Exception:
-            db.session.rollback()
+        user_id = session.get('user_id')
+        g.user_id = user_id
+        if user_id:
+            activity.touch(user_id)
+    
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus text exposition (optionally behind ``Authorization: Bearer <METRICS_TOKEN>``)."""
+        token = app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+        response = make_response(REGISTRY.render())
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        return response
     
     # Route to serve uploaded files
-    @app.route('/uploads/<filename>')
+    @app.route('/uploads/<path:filename>')
     def serve_upload(filename):
-        """Serve uploaded files."""
-        from flask import send_from_directory
+        """Serve an uploaded file to its owner or an admin (Range/ETag aware)."""
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'success': False, 'message': 'Please login to access this resource'}), 401
+        relpath = stored_relpath(filename)
+        if relpath.startswith(BLOB_DIR + '/'):
+            q = Document.query.filter(Document.content_hash == relpath.rsplit('/', 1)[-1])
+        else:
+            # Legacy rows may store an absolute path; the suffix match only
+            # narrows the candidates ('1_cv.pdf' is also a suffix of '11_cv.pdf')
+            q = Document.query.filter(Document.filepath.endswith(relpath, autoescape=True))
+        if session.get('user_role') != 'admin':
+            q = q.filter(Document.user_id == user_id)
+        if not any(stored_relpath(fp) == relpath for fp, in q.with_entities(Document.filepath)):
+            return jsonify({'success': False, 'message': 'File not found'}), 404
         upload_dir = Config.UPLOAD_FOLDER
-        return send_from_directory(upload_dir, filename)
+        return send_stored_file(upload_dir, filename, max_age=app.config.get('DOWNLOAD_CACHE_MAX_AGE', 31536000))
     
     # Create uploads folder if it doesn't exist (absolute path)
     upload_dir = Config.UPLOAD_FOLDER
@@ -91,6 +128,8 @@ def create_app():
     # Create database tables
     with app.app_context():
         db.create_all()
+        init_search_index()
+        schema.refresh()
         
         # Create a default admin user if it doesn't exist
         if not User.query.filter_by(email='admin@doclocker.com').first():
@@ -103,6 +142,12 @@ def create_app():
             db.session.add(admin)
             db.session.commit()
             print("Default admin user created: admin@doclocker.com / admin123")
+        
+        # Jobs queued or running when the last process stopped were lost with it
+        if app.config.get('RESUME_PENDING_DOCUMENTS', True):
+            resumed = resume_pending_documents()
+            if resumed:
+                print(f"Re-queued processing for {resumed} unfinished document(s)")
     
     # Error handlers
     @app.errorhandler(404)
@@ -116,8 +161,44 @@ def create_app():
     return app
 
 
+def register_gauges(app, pool_metrics):
+    """Expose background work and connection pool state, read at scrape time."""
+    jobs = app.extensions['job_queue']
+    scheduler = app.extensions['profile_scheduler']
+    activity = app.extensions['activity_tracker']
+    llm = app.extensions['llm_client']
+    REGISTRY.gauge('doclocker_job_queue_depth', 'Background jobs waiting for a worker.', jobs.depth)
+    REGISTRY.gauge('doclocker_job_queue_active', 'Background jobs currently running.', jobs.active)
+    REGISTRY.gauge('doclocker_profile_refresh_pending', 'Users with a profile refresh waiting or running.',
+                   scheduler.pending)
+    REGISTRY.gauge('doclocker_last_active_pending', 'Buffered last_active updates not yet flushed.',
+                   activity.pending)
+    REGISTRY.gauge('doclocker_llm_in_flight', 'LLM calls currently in flight.', llm.in_flight)
+    REGISTRY.gauge('doclocker_llm_circuit_open', '1 while the LLM circuit breaker is failing fast.',
+                   lambda: 1 if llm.breaker.state() == 'open' else 0)
+    REGISTRY.gauge('doclocker_db_pool', 'Connection pool state and counters (see GET /api/admin/db/pool).',
+                   lambda: {k: v for k, v in pool_metrics.snapshot().items() if isinstance(v, (int, float))},
+                   ('stat',))
+
+
+def run_maintenance_command(app, command: str) -> bool:
+    """Run a one-off maintenance command (``python app.py <command>``)."""
+    commands = {
+        'rebuild-user-stats': lambda: print(f"Rebuilt user_stats for {rebuild_user_stats()} users"),
+        'rebuild-search-index': lambda: (rebuild_search_index(), print("Rebuilt full-text search index")),
+    }
+    if command not in commands:
+        print(f"Unknown command: {command}. Available: {', '.join(sorted(commands))}")
+        return False
+    with app.app_context():
+        commands[command]()
+    return True
+
+
 if __name__ == '__main__':
     app = create_app()
+    if len(sys.argv) > 1:
+        sys.exit(0 if run_maintenance_command(app, sys.argv[1]) else 1)
     print("\n" + "="*50)
     print("Doc Locker Backend Server")
     print("="*50)
@@ -0,0 +1,58 @@
+"""
+Deterministic stand-in for ``google.generativeai`` used by the benchmarks.
+
+Replies are derived from a hash of the prompt, so the same input always
+yields the same profile, and every call sleeps for a configurable latency to
+model the network round trip.
+"""
+import json
+import time
+import hashlib
+import threading
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    latency = 0.0
+    calls = 0
+    _lock = threading.Lock()
+
+    def __init__(self, model_name: str = '', **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        with FakeGenerativeModel._lock:
+            FakeGenerativeModel.calls += 1
+        if stream:
+            return self._stream(self._reply(prompt))
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeResponse(self._reply(prompt))
+
+    def _stream(self, text: str, pieces: int = 10):
+        step = -(-len(text) // pieces)
+        for i in range(0, len(text), step):
+            time.sleep(self.latency / pieces)
+            yield FakeResponse(text[i:i + step])
+
+    def _reply(self, prompt) -> str:
+        digest = hashlib.sha256(str(prompt).encode('utf-8')).hexdigest()
+        profile = {
+            'name': f'Student {digest[:6]}',
+            'summary': f'Benchmark profile {digest[:16]}',
+            'skills': ['Python', 'SQL', 'Data Analysis'][: 1 + int(digest[0], 16) % 3],
+            'education': [{'degree': 'B.Tech', 'institution': 'Benchmark University'}],
+        }
+        return '```json\n' + json.dumps(profile) + '\n```'
+
+
+def install(genai_module, latency: float = 0.0):
+    """Replace ``genai.GenerativeModel`` with the fake; returns the fake class."""
+    FakeGenerativeModel.latency = latency
+    FakeGenerativeModel.calls = 0
+    genai_module.GenerativeModel = FakeGenerativeModel
+    return FakeGenerativeModel
@@ -0,0 +1,69 @@
+"""
+Generated upload fixtures: a multi-page PDF with a real text layer and a PNG
+with rendered text (for the OCR path). Built in memory so runs need no
+checked-in binaries and are identical on every machine.
+"""
+import io
+
+SAMPLE_LINES = [
+    'Bachelor of Technology in Computer Science',
+    'Benchmark University, 2021 - 2025, CGPA 8.7',
+    'AWS Certified Cloud Practitioner',
+    'Skills: Python, SQL, Flask, React, Docker',
+    'Internship: Data Engineering Intern, Example Corp',
+]
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages: int = 3, lines_per_page: int = 40) -> bytes:
+    """Return a PDF whose pages carry extractable text."""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+    pages_id = len(objects) + 1 + pages * 2  # reserved: placed after every page/content pair
+    page_ids = []
+    for p in range(pages):
+        lines = [f'{SAMPLE_LINES[i % len(SAMPLE_LINES)]} (page {p + 1}, line {i + 1})' for i in range(lines_per_page)]
+        text = ' '.join(f'({_escape(line)}) \'' for line in lines)
+        stream = f'BT /F1 10 Tf 12 TL 40 780 Td {text} ET'.encode('latin-1')
+        content = add(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        page_ids.append(add(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 %d 0 R >> >> >>' % (pages_id, content, font)
+        ))
+    kids = ' '.join(f'{i} 0 R' for i in page_ids).encode('ascii')
+    assert add(b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % pages) == pages_id
+    catalog = add(b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id)
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b'%010d 00000 n \n' % offset)
+    out.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, catalog, xref))
+    return out.getvalue()
+
+
+def make_png(width: int = 1200, height: int = 400) -> bytes:
+    """Return a PNG with a few lines of dark text on white (OCR input)."""
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(SAMPLE_LINES):
+        draw.text((20, 20 + i * 60), line, fill='black')
+    out = io.BytesIO()
+    img.save(out, format='PNG')
+    return out.getvalue()
@@ -0,0 +1,329 @@
+"""
+Offline benchmark suite for the upload, profile and admin hot paths.
+
+Builds the real app through ``create_app()`` against a throwaway SQLite
+database (or ``--database-url``), replaces Gemini with a deterministic fake
+with configurable latency, and reports throughput, p50/p99 latency and
+queries per operation as JSON so runs can be diffed between releases:
+
+    cd backend
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --iterations 50 --gemini-latency 0.8 --populations 100,1000,10000
+
+Only point ``--database-url`` at a disposable database: the suite inserts
+users and documents.
+"""
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import contextlib
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timedelta
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class QueryCounter:
+    """Counts statements the benchmark thread executes (background jobs are excluded)."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self._thread = threading.get_ident()
+        event.listen(engine, 'before_cursor_execute', self._inc)
+
+    def _inc(self, *args):
+        if threading.get_ident() == self._thread:
+            self.count += 1
+
+
+def measure(fn, iterations: int, warmup: int = 1, queries: QueryCounter | None = None) -> dict:
+    """Call ``fn(i)`` ``iterations`` times and summarize the latencies."""
+    for i in range(warmup):
+        fn(-1 - i)
+    samples = []
+    queries_before = queries.count if queries else 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    samples.sort()
+    result = {
+        'iterations': iterations,
+        'throughput_per_s': round(iterations / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'min_ms': round(samples[0], 3),
+        'max_ms': round(samples[-1], 3),
+    }
+    if queries is not None:
+        result['queries_per_op'] = round((queries.count - queries_before) / iterations, 2)
+    return result
+
+
+def check(response, expected=(200,)):
+    if response.status_code not in expected:
+        raise RuntimeError(f'{response.request.path} returned {response.status_code}: {response.get_data(as_text=True)[:300]}')
+    return response
+
+
+class Bench:
+    def __init__(self, args, workdir: str):
+        self.args = args
+        self.workdir = workdir
+
+        from config import Config
+        Config.UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+
+        import google.generativeai as genai
+        from benchmarks import fake_genai
+        self.fake = fake_genai.install(genai, latency=args.gemini_latency)
+
+        from app import create_app
+        from models import db
+        self.app = create_app()
+        self.db = db
+        with self.app.app_context():
+            self.queries = QueryCounter(db.engine)
+            self.dialect = db.engine.dialect.name
+
+        self.student = self.app.test_client()
+        check(self.student.post('/api/signup', json={
+            'name': 'Bench Student', 'email': f'bench-{int(time.time() * 1000)}@example.com', 'password': 'bench'
+        }), (200, 201))
+        with self.student.session_transaction() as sess:
+            self.student_id = sess['user_id']
+        self.admin = self.app.test_client()
+        check(self.admin.post('/api/login', json={'email': 'admin@doclocker.com', 'password': 'admin123'}))
+
+    def wait_idle(self):
+        """Block until uploads are processed and debounced profile refreshes have run."""
+        jobs = self.app.extensions['job_queue']
+        scheduler = self.app.extensions['profile_scheduler']
+        while True:
+            jobs.join()
+            if scheduler.pending() == 0 and jobs.depth() == 0 and jobs.active() == 0:
+                return
+            time.sleep(0.02)
+
+    def close(self):
+        """Stop background work while the database still exists."""
+        self.wait_idle()
+        self.app.extensions['activity_tracker'].shutdown()
+        self.app.extensions['job_queue'].shutdown()
+        from utils.extraction import get_engine
+        get_engine().shutdown()
+
+    # -- scenarios -------------------------------------------------------
+
+    def bench_extract(self, pdf: bytes, png: bytes) -> dict:
+        from routes.student_routes import extract_text_from_file
+        from utils.extraction import ExtractionError
+        results = {}
+        for name, data, ext in (('pdf', pdf, '.pdf'), ('image', png, '.png')):
+            path = os.path.join(self.workdir, f'fixture{ext}')
+            with open(path, 'wb') as f:
+                f.write(data)
+            with self.app.app_context():
+                try:
+                    chars = len(extract_text_from_file(path, ext, use_cache=False) or '')
+                except ExtractionError as e:
+                    # e.g. no tesseract binary for the image fixture
+                    results[name] = {'error': str(e)}
+                    continue
+                results[name] = measure(lambda i: extract_text_from_file(path, ext, use_cache=False),
+                                        self.args.iterations, warmup=1)
+            results[name]['extracted_chars'] = chars
+        return results
+
+    def bench_upload(self, pdf: bytes, png: bytes) -> dict:
+        results = {}
+        for name, data, filename in (('pdf', pdf, 'transcript.pdf'), ('image', png, 'certificate.png')):
+            def upload(i, data=data, filename=filename, name=name):
+                # Unique trailing bytes so every upload is a new blob (no dedup shortcut)
+                body = data + f'\n% bench {name} {i} {time.perf_counter_ns()}\n'.encode('ascii')
+                check(self.student.post('/api/upload', data={'document': (io.BytesIO(body), filename)},
+                                        content_type='multipart/form-data'), (201, 202))
+
+            started = time.perf_counter()
+            stats = measure(upload, self.args.iterations, warmup=1, queries=self.queries)
+            self.wait_idle()
+            drained = time.perf_counter() - started
+            stats['pipeline_seconds'] = round(drained, 3)
+            stats['pipeline_docs_per_s'] = round((self.args.iterations + 1) / drained, 2)
+            results[name] = stats
+        return results
+
+    def bench_ai_profile(self) -> dict:
+        from routes.student_routes import refresh_user_profile
+        with self.app.app_context():
+            refresh_user_profile(self.student_id)
+        calls_before = self.fake.calls
+        stats = measure(lambda i: check(self.student.get(f'/api/profile/{self.student_id}')),
+                        self.args.iterations, warmup=1, queries=self.queries)
+        stats['gemini_calls'] = self.fake.calls - calls_before
+        return stats
+
+    def populate(self, target: int):
+        """Grow the user table to ``target`` students with a few documents each."""
+        from sqlalchemy import insert, func
+        from models import User, Document
+        from utils.user_stats import rebuild_user_stats
+        with self.app.app_context():
+            existing = self.db.session.query(func.count(User.id)).scalar()
+            missing = target - existing
+            if missing <= 0:
+                return
+            base = datetime(2026, 1, 1)
+            rows = [{
+                'name': f'Student {existing + i}',
+                'email': f'pop-{existing + i}-{time.perf_counter_ns()}@example.com',
+                'password': 'bench',
+                'role': 'user',
+                'status': 'active',
+                'created_at': base + timedelta(minutes=i),
+                'last_active': None if i % 10 == 0 else base + timedelta(minutes=(i * 7919) % 100000),
+            } for i in range(missing)]
+            for start in range(0, len(rows), 1000):
+                self.db.session.execute(insert(User), rows[start:start + 1000])
+            new_ids = [uid for (uid,) in self.db.session.query(User.id).order_by(User.id.desc()).limit(missing)]
+            docs = [{
+                'user_id': uid, 'filename': f'doc-{uid}-{n}.pdf', 'filepath': f'{uid}_doc-{n}.pdf',
+                'status': ('done', 'failed', 'processing')[n % 3], 'uploaded_at': base + timedelta(hours=n),
+            } for uid in new_ids for n in range(3)]
+            for start in range(0, len(docs), 1000):
+                self.db.session.execute(insert(Document), docs[start:start + 1000])
+            self.db.session.commit()
+            rebuild_user_stats()
+
+    def bench_list_users(self) -> dict:
+        results = {}
+        limit = 20
+        for population in self.args.populations:
+            self.populate(population)
+            pages = max(1, population // limit)
+            entry = {
+                'first_page': measure(
+                    lambda i: check(self.admin.get(f'/api/admin/users?limit={limit}&page=1')),
+                    self.args.iterations, warmup=1, queries=self.queries),
+                'deep_offset_page': measure(
+                    lambda i: check(self.admin.get(f'/api/admin/users?limit={limit}&page={pages}')),
+                    self.args.iterations, warmup=1, queries=self.queries),
+            }
+            # Keyset: walk towards the end once, then time fetching the deep page by its cursor
+            cursor, walked = '', 0
+            while walked < pages - 1:
+                data = check(self.admin.get(f'/api/admin/users?limit={limit}&cursor={cursor}')).get_json()['data']
+                if not data['next_cursor']:
+                    break
+                cursor, walked = data['next_cursor'], walked + 1
+            entry['deep_cursor_page'] = measure(
+                lambda i: check(self.admin.get(f'/api/admin/users?limit={limit}&cursor={cursor}')),
+                self.args.iterations, warmup=1, queries=self.queries)
+            results[str(population)] = entry
+        return results
+
+    def run(self) -> dict:
+        from benchmarks.fixtures import make_pdf, make_png
+        pdf = make_pdf(pages=self.args.pdf_pages)
+        png = make_png()
+        scenarios = {
+            'extract_text_from_file': lambda: self.bench_extract(pdf, png),
+            'upload_document': lambda: self.bench_upload(pdf, png),
+            'get_ai_profile': self.bench_ai_profile,
+            'list_users': self.bench_list_users,
+        }
+        results = {}
+        for name, fn in scenarios.items():
+            if self.args.only and name not in self.args.only:
+                continue
+            print(f'Running {name}...', file=sys.stderr)
+            results[name] = fn()
+            self.wait_idle()
+        return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--iterations', type=int, default=20, help='timed calls per scenario (default 20)')
+    parser.add_argument('--gemini-latency', type=float, default=0.2, help='fake Gemini latency in seconds (default 0.2)')
+    parser.add_argument('--populations', default='100,1000,5000',
+                        type=lambda v: sorted(int(p) for p in v.split(',') if p),
+                        help='user counts for list_users (default 100,1000,5000)')
+    parser.add_argument('--pdf-pages', type=int, default=5, help='pages in the PDF fixture (default 5)')
+    parser.add_argument('--database-url', help='database to use instead of a temporary SQLite file (must be disposable)')
+    parser.add_argument('--only', nargs='*', help='run only these scenarios')
+    parser.add_argument('--output', help='write JSON results here (default: stdout)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='doclocker-bench-')
+    # Must be set before config.py is imported
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault('PROFILE_DEBOUNCE_SECONDS', '0.05')
+    os.environ.setdefault('PROFILE_DEBOUNCE_MAX_SECONDS', '0.5')
+    bench = None
+    try:
+        # The app logs with print(); keep stdout clean for the JSON report
+        with contextlib.redirect_stdout(sys.stderr):
+            bench = Bench(args, workdir)
+            started_at = datetime.utcnow().isoformat() + 'Z'
+            results = bench.run()
+            bench.close()
+        report = {
+            'meta': {
+                'started_at': started_at,
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'database': bench.dialect,
+                'tesseract_available': shutil.which('tesseract') is not None,
+                'iterations': args.iterations,
+                'gemini_latency_s': args.gemini_latency,
+                'gemini_calls': bench.fake.calls,
+                'pdf_pages': args.pdf_pages,
+                'populations': args.populations,
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(output + '\n')
+            print(f'Wrote {args.output}', file=sys.stderr)
+        else:
+            print(output)
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
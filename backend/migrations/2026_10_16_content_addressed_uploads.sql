@@ -0,0 +1,11 @@
+-- Migration: Content-addressed upload storage (2026-10-16)
+-- documents.filepath now points at blobs/<aa>/<sha256> under the upload folder;
+-- rows created before this migration keep their {user_id}_{filename} paths.
+
+START TRANSACTION;
+
+ALTER TABLE documents
+  ADD COLUMN content_hash CHAR(64) NULL AFTER filepath,
+  ADD INDEX idx_documents_content_hash (content_hash);
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- Migration: Full-text search over documents (2026-10-16)
+-- Backs GET /api/admin/search. InnoDB keeps the index current on every
+-- insert/update/delete; words shorter than innodb_ft_min_token_size (3) are
+-- not indexed.
+
+START TRANSACTION;
+
+ALTER TABLE documents
+  ADD FULLTEXT INDEX idx_documents_fulltext (filename, extracted_text);
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- Migration: Extraction result cache (2026-10-16)
+-- Maps (content hash, extractor version, OCR settings) to extracted text.
+-- Rows are evicted LRU by last_used_at once EXTRACTION_CACHE_MAX_BYTES is exceeded.
+
+START TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS extraction_cache (
+  cache_key CHAR(64) NOT NULL,
+  content_hash CHAR(64) NOT NULL,
+  extractor_version INT NOT NULL,
+  extracted_text LONGTEXT NULL,
+  pages JSON NULL,
+  size_bytes BIGINT NOT NULL DEFAULT 0,
+  created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  last_used_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (cache_key),
+  INDEX idx_extraction_cache_hash (content_hash),
+  INDEX idx_extraction_cache_version (extractor_version),
+  INDEX idx_extraction_cache_last_used (last_used_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Migration: Indexes for keyset pagination (2026-10-16)
+-- The admin user list and per-user file list page by (sort column, id)
+-- instead of OFFSET; these indexes let each page start with an index seek.
+
+START TRANSACTION;
+
+ALTER TABLE users
+  ADD INDEX idx_users_last_active (last_active, id),
+  ADD INDEX idx_users_created_at (created_at, id),
+  ADD INDEX idx_users_name (name, id);
+
+ALTER TABLE documents
+  ADD INDEX idx_documents_user_uploaded (user_id, uploaded_at, id);
+
+COMMIT;
@@ -0,0 +1,19 @@
+-- Migration: Gemini profile generation cache (2026-10-16)
+-- Keyed by sha256(model name + prompt); expires after PROFILE_CACHE_TTL and is
+-- trimmed LRU to PROFILE_CACHE_MAX_ENTRIES rows.
+
+START TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS profile_generation_cache (
+  cache_key CHAR(64) NOT NULL,
+  model VARCHAR(64) NOT NULL,
+  profile_json JSON NULL,
+  hits INT NOT NULL DEFAULT 0,
+  created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  last_used_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (cache_key),
+  INDEX idx_profile_generation_cache_created (created_at),
+  INDEX idx_profile_generation_cache_last_used (last_used_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+COMMIT;
@@ -0,0 +1,47 @@
+-- Migration: Per-user stats rollup (2026-10-16)
+-- Maintained by the application on every upload/delete/status change/profile
+-- version; rebuild at any time with `python app.py rebuild-user-stats`.
+
+START TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS user_stats (
+  user_id INT NOT NULL,
+  files_total INT NOT NULL DEFAULT 0,
+  processing INT NOT NULL DEFAULT 0,
+  failed INT NOT NULL DEFAULT 0,
+  latest_profile_version INT NOT NULL DEFAULT 0,
+  last_upload TIMESTAMP NULL DEFAULT NULL,
+  updated_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (user_id),
+  CONSTRAINT fk_user_stats_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Backfill from existing data
+INSERT INTO user_stats (user_id, files_total, processing, failed, latest_profile_version, last_upload)
+SELECT
+  u.id,
+  COALESCE(d.files_total, 0),
+  COALESCE(d.processing, 0),
+  COALESCE(d.failed, 0),
+  COALESCE(pv.latest_version, 0),
+  d.last_upload
+FROM users u
+LEFT JOIN (
+  SELECT user_id,
+         COUNT(*) AS files_total,
+         SUM(status = 'processing') AS processing,
+         SUM(status = 'failed') AS failed,
+         MAX(uploaded_at) AS last_upload
+  FROM documents GROUP BY user_id
+) d ON d.user_id = u.id
+LEFT JOIN (
+  SELECT user_id, MAX(version) AS latest_version FROM profile_versions GROUP BY user_id
+) pv ON pv.user_id = u.id
+ON DUPLICATE KEY UPDATE
+  files_total = VALUES(files_total),
+  processing = VALUES(processing),
+  failed = VALUES(failed),
+  latest_profile_version = VALUES(latest_profile_version),
+  last_upload = VALUES(last_upload);
+
+COMMIT;
@@ -21,6 +21,13 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_active = db.Column(db.DateTime, nullable=True)
     
+    # Keyset pagination for the admin user list walks these (sort column, id) indexes
+    __table_args__ = (
+        db.Index('idx_users_last_active', 'last_active', 'id'),
+        db.Index('idx_users_created_at', 'created_at', 'id'),
+        db.Index('idx_users_name', 'name', 'id'),
+    )
+    
     # Relationship with documents
     documents = db.relationship('Document', backref='user', lazy=True, cascade='all, delete-orphan')
     
@@ -63,28 +70,73 @@ class Document(db.Model):
     mime_type = db.Column(db.String(100), nullable=True)
     size_bytes = db.Column(db.BigInteger, nullable=True)
     filepath = db.Column(db.String(500), nullable=False)
-    extracted_text = db.Column(db.Text, nullable=True)
-    status = db.Column(db.String(20), nullable=False, default='uploaded')  # 'uploaded'|'processing'|'done'|'failed'
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 of the stored blob
+    # Deferred: OCR text can be megabytes per row; load it only when asked for
+    extracted_text = db.deferred(db.Column(db.Text, nullable=True))
+    # active_history: the user_stats rollup needs the old status even after a commit expired it
+    status = db.column_property(db.Column(db.String(20), nullable=False, default='uploaded'),  # 'uploaded'|'processing'|'done'|'failed'
+                                active_history=True)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        """Convert document object to dictionary."""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'filename': self.filename,
-            'mime_type': self.mime_type,
-            'size_bytes': self.size_bytes,
-            'filepath': self.filepath,
-            'extracted_text': self.extracted_text,
-            'status': self.status,
-            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None
-        }
+    ALL_FIELDS = ('id', 'user_id', 'filename', 'mime_type', 'size_bytes', 'filepath',
+                  'content_hash', 'extracted_text', 'status', 'uploaded_at')
+    # List payloads leave the text out unless requested (?include=extracted_text)
+    DEFAULT_FIELDS = tuple(f for f in ALL_FIELDS if f != 'extracted_text')
+    
+    __table_args__ = (
+        db.Index('idx_documents_user_uploaded', 'user_id', 'uploaded_at', 'id'),
+    )
+    
+    def to_dict(self, fields=None):
+        """Convert document object to dictionary (``fields`` defaults to DEFAULT_FIELDS)."""
+        data = {}
+        for field in fields or self.DEFAULT_FIELDS:
+            value = getattr(self, field)
+            if field == 'uploaded_at':
+                value = value.isoformat() if value else None
+            data[field] = value
+        return data
     
     def __repr__(self):
         return f'<Document {self.filename}>'
 
 
+class UserStats(db.Model):
+    """Per-user rollup of document/profile counters, maintained on every flush."""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    files_total = db.Column(db.Integer, nullable=False, default=0)
+    processing = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    latest_profile_version = db.Column(db.Integer, nullable=False, default=0)
+    last_upload = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'files_total': self.files_total or 0,
+            'processing': self.processing or 0,
+            'failed': self.failed or 0,
+            'latest_profile_version': self.latest_profile_version or 0,
+            'last_upload': self.last_upload.isoformat() if self.last_upload else None,
+        }
+
+
+class ExtractionCacheEntry(db.Model):
+    """Extracted text keyed by file content hash and extractor settings."""
+    __tablename__ = 'extraction_cache'
+
+    cache_key = db.Column(db.String(64), primary_key=True)  # sha256(content_hash + settings)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)
+    extractor_version = db.Column(db.Integer, nullable=False, index=True)
+    extracted_text = db.Column(db.Text, nullable=True)
+    pages = db.Column(db.JSON, nullable=True)  # [{'page', 'chars', 'method'}, ...]
+    size_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
 class UserProfile(db.Model):
     """Stores AI-generated profile JSON per user."""
     __tablename__ = 'user_profile'
@@ -107,6 +159,18 @@ class UserProfile(db.Model):
         }
 
 
+class ProfileGenerationCache(db.Model):
+    """Memoized Gemini profile output keyed by a digest of model + prompt."""
+    __tablename__ = 'profile_generation_cache'
+
+    cache_key = db.Column(db.String(64), primary_key=True)  # sha256(model + prompt)
+    model = db.Column(db.String(64), nullable=False)
+    profile_json = db.Column(db.JSON, nullable=True)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
 class ProfileVersion(db.Model):
     __tablename__ = 'profile_versions'
 
@@ -5,9 +5,18 @@ from flask import Blueprint, request, jsonify, session
 import json
 from functools import wraps
 from sqlalchemy import func, or_, desc, asc
-from models import db, User, Document, ProfileVersion, UserProfile, AdminEvent
+from models import db, User, Document, ProfileVersion, UserProfile, AdminEvent, UserStats
 from sqlalchemy import text
-from routes.student_routes import generate_profile_with_gemini
+from sqlalchemy.orm import undefer
+from routes.student_routes import generate_profile_with_gemini, process_document
+from utils.job_queue import enqueue
+from utils.profile_scheduler import get_profile_scheduler
+from utils.user_stats import get_user_stats
+from utils.pagination import keyset_page, InvalidCursor
+from utils.search import search_documents, SearchUnavailable
+from utils.schema_capabilities import schema_supports, get_schema_capabilities
+from utils.projection import parse_projection, load_columns, ProjectionError
+from utils.db_pool import get_pool_metrics
 import random
 
 admin_bp = Blueprint('admin', __name__)
@@ -46,8 +55,11 @@ def list_users():
     search = (request.args.get('search') or '').strip()
     status = (request.args.get('status') or '').strip()
     sort = (request.args.get('sort') or 'last_active:desc').strip()
-    page = int(request.args.get('page') or 1)
-    limit = min(max(int(request.args.get('limit') or 20), 1), 100)
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    # Passing ``cursor`` (empty for the first page) switches to keyset pagination
+    cursor = request.args.get('cursor')
+    include_total = request.args.get('include_total') in ('1', 'true')
 
     q = db.session.query(User)
 
@@ -65,17 +77,26 @@ def list_users():
         'created_at': User.created_at,
         'name': User.name
     }.get(sort_field, User.last_active)
-    q = q.order_by(desc(sort_col) if sort_dir == 'desc' else asc(sort_col))
 
-    total = q.count()
-    users = q.offset((page - 1) * limit).limit(limit).all()
+    if cursor is not None:
+        try:
+            users, next_cursor = keyset_page(q, sort_col, User.id, sort_dir == 'desc', limit,
+                                             cursor=cursor or None, nullable=sort_col is not User.name)
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        total = q.count() if include_total else None
+    else:
+        q_sorted = q.order_by(desc(sort_col) if sort_dir == 'desc' else asc(sort_col))
+        total = q_sorted.count()
+        users = q_sorted.offset((page - 1) * limit).limit(limit).all()
+        next_cursor = None
+
+    # Precomputed per-user counters: one primary-key lookup for the whole page
+    stats_by_user = get_user_stats([u.id for u in users])
 
-    # Precompute stats per user
     results = []
     for u in users:
-        files_count = db.session.query(func.count(Document.id)).filter(Document.user_id == u.id).scalar() or 0
-        failed_files = db.session.query(func.count(Document.id)).filter(Document.user_id == u.id, Document.status == 'failed').scalar() or 0
-        latest_version = db.session.query(func.max(ProfileVersion.version)).filter(ProfileVersion.user_id == u.id).scalar()
+        stats = stats_by_user.get(u.id)
         results.append({
             'id': u.id,
             'name': u.name,
@@ -84,12 +105,13 @@ def list_users():
             'status': u.status,
             'created_at': u.created_at.isoformat() if u.created_at else None,
             'last_active': u.last_active.isoformat() if u.last_active else None,
-            'files_count': files_count,
-            'failed_files': failed_files,
-            'latest_profile_version': latest_version or 0,
+            'files_count': stats.files_total if stats else 0,
+            'failed_files': stats.failed if stats else 0,
+            'latest_profile_version': stats.latest_profile_version if stats else 0,
         })
 
-    return jsonify({'success': True, 'data': {'total': total, 'page': page, 'limit': limit, 'users': results}}), 200
+    return jsonify({'success': True, 'data': {'total': total, 'page': page, 'limit': limit,
+                                              'next_cursor': next_cursor, 'users': results}}), 200
 
 
 @admin_bp.route('/api/admin/users/<int:user_id>/overview', methods=['GET'])
@@ -100,11 +122,8 @@ def user_overview(user_id: int):
     if not user:
         return jsonify({'success': False, 'message': 'User not found'}), 404
 
-    files_total = db.session.query(func.count(Document.id)).filter(Document.user_id == user_id).scalar() or 0
-    processing = db.session.query(func.count(Document.id)).filter(Document.user_id == user_id, Document.status == 'processing').scalar() or 0
-    failed = db.session.query(func.count(Document.id)).filter(Document.user_id == user_id, Document.status == 'failed').scalar() or 0
-    latest_version = db.session.query(func.max(ProfileVersion.version)).filter(ProfileVersion.user_id == user_id).scalar() or 0
-    last_upload = db.session.query(func.max(Document.uploaded_at)).filter(Document.user_id == user_id).scalar()
+    stats = get_user_stats([user_id]).get(user_id)
+    counters = stats.to_dict() if stats else UserStats().to_dict()
 
     return jsonify({'success': True, 'data': {
         'id': user.id,
@@ -114,11 +133,7 @@ def user_overview(user_id: int):
         'status': user.status,
         'created_at': user.created_at.isoformat() if user.created_at else None,
         'last_active': user.last_active.isoformat() if user.last_active else None,
-        'files_total': files_total,
-        'processing': processing,
-        'failed': failed,
-        'latest_profile_version': latest_version,
-        'last_upload': last_upload.isoformat() if last_upload else None,
+        **counters,
     }}), 200
 
 
@@ -135,12 +150,8 @@ def user_profile(user_id: int):
     if not row:
         return jsonify({'success': True, 'data': {'profile_json': None, 'current_version': 0}}), 200
 
-    # Check if current_version column exists
     try:
-        col_exists = db.session.execute(
-            text("SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_profile' AND COLUMN_NAME = 'current_version' LIMIT 1")
-        ).first()
-        if col_exists:
+        if schema_supports('versioned_profiles'):
             ptr = db.session.execute(
                 text("SELECT current_version FROM user_profile WHERE user_id = :uid LIMIT 1"),
                 { 'uid': user_id }
@@ -160,12 +171,92 @@ def user_profile(user_id: int):
 @login_required
 @admin_required
 def user_files(user_id: int):
-    page = int(request.args.get('page') or 1)
-    limit = min(max(int(request.args.get('limit') or 20), 1), 100)
-    q = Document.query.filter_by(user_id=user_id).order_by(Document.uploaded_at.desc())
-    total = q.count()
-    rows = q.offset((page - 1) * limit).limit(limit).all()
-    return jsonify({'success': True, 'data': {'total': total, 'page': page, 'limit': limit, 'files': [r.to_dict() for r in rows]}}), 200
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    cursor = request.args.get('cursor')
+    try:
+        fields = parse_projection(request.args, Document.ALL_FIELDS, Document.DEFAULT_FIELDS)
+    except ProjectionError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    q = Document.query.options(load_columns(Document, fields, 'uploaded_at')).filter_by(user_id=user_id)
+    if cursor is not None:
+        try:
+            rows, next_cursor = keyset_page(q, Document.uploaded_at, Document.id, True, limit, cursor=cursor or None)
+        except InvalidCursor as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+    else:
+        q = q.order_by(Document.uploaded_at.desc())
+        rows = q.offset((page - 1) * limit).limit(limit).all()
+        next_cursor = None
+    # Exact total from the stats rollup instead of COUNT(*) on every page turn
+    stats = get_user_stats([user_id]).get(user_id)
+    total = stats.files_total if stats else 0
+    return jsonify({'success': True, 'data': {'total': total, 'page': page, 'limit': limit, 'next_cursor': next_cursor,
+                                              'files': [r.to_dict(fields) for r in rows]}}), 200
+
+
+@admin_bp.route('/api/admin/search', methods=['GET'])
+@login_required
+@admin_required
+def search():
+    """Ranked full-text search over document text; ``"quoted words"`` match as a phrase."""
+    q = (request.args.get('q') or '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    user_id = request.args.get('user_id', type=int)
+    if not q:
+        return jsonify({'success': False, 'message': 'Query is required'}), 400
+
+    try:
+        hits, has_more = search_documents(q, user_id=user_id, limit=limit, offset=(page - 1) * limit)
+    except SearchUnavailable as e:
+        print(f"Search unavailable: {str(e)}")
+        return jsonify({'success': False, 'message': 'Search index unavailable; run the document_search migration'}), 503
+
+    owners = {u.id: u for u in User.query.filter(User.id.in_({h['user_id'] for h in hits}))} if hits else {}
+    results = []
+    for h in hits:
+        owner = owners.get(h['user_id'])
+        uploaded_at = h['uploaded_at']
+        results.append({
+            'document_id': h['id'],
+            'filename': h['filename'],
+            'status': h['status'],
+            'uploaded_at': uploaded_at.isoformat() if hasattr(uploaded_at, 'isoformat') else uploaded_at,
+            'score': round(float(h['score'] or 0), 4),
+            'snippet': h['snippet'],
+            'user': {
+                'id': h['user_id'],
+                'name': owner.name if owner else None,
+                'masked_email': mask_email(owner.email) if owner else None,
+            },
+        })
+
+    return jsonify({'success': True, 'data': {'q': q, 'page': page, 'limit': limit,
+                                              'has_more': has_more, 'results': results}}), 200
+
+
+@admin_bp.route('/api/admin/schema', methods=['GET'])
+@login_required
+@admin_required
+def schema_capabilities():
+    return jsonify({'success': True, 'data': get_schema_capabilities().as_dict()}), 200
+
+
+@admin_bp.route('/api/admin/schema/refresh', methods=['POST'])
+@login_required
+@admin_required
+def refresh_schema_capabilities():
+    """Re-probe the schema after applying migrations to a running server."""
+    return jsonify({'success': True, 'data': get_schema_capabilities().refresh()}), 200
+
+
+@admin_bp.route('/api/admin/db/pool', methods=['GET'])
+@login_required
+@admin_required
+def db_pool_metrics():
+    """Connection pool usage: checked-out connections, wait times, overflow, invalidations."""
+    return jsonify({'success': True, 'data': get_pool_metrics().snapshot()}), 200
 
 
 @admin_bp.route('/api/admin/users/<int:user_id>/activity', methods=['GET'])
@@ -222,16 +313,13 @@ def user_actions(user_id: int):
 
         if action_type == 'REGENERATE':
             # Build fresh profile from current documents using Gemini
-            docs = Document.query.filter_by(user_id=user_id).all()
+            docs = Document.query.options(undefer(Document.extracted_text)).filter_by(user_id=user_id).all()
             combined = ' '.join([(d.extracted_text or '') for d in docs]).strip()
             if not combined or len(combined) <= 10:
                 return jsonify({'success': False, 'message': 'Not enough readable text to regenerate'}), 400
-            payload_json = generate_profile_with_gemini(combined, variation_seed=random.randint(1, 10_000_000)) or {}
-            # Check if versioning pointer column exists
-            col_exists = db.session.execute(
-                text("SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_profile' AND COLUMN_NAME = 'current_version' LIMIT 1")
-            ).first()
-            if col_exists:
+            with get_profile_scheduler().user_lock(user_id):
+                payload_json = generate_profile_with_gemini(combined, variation_seed=random.randint(1, 10_000_000)) or {}
+            if schema_supports('versioned_profiles'):
                 ver = next_profile_version(user_id)
                 pv = ProfileVersion(user_id=user_id, version=ver, profile_json=payload_json, profile_html=details.get('profile_html'))
                 db.session.add(pv)
@@ -277,6 +365,7 @@ def user_actions(user_id: int):
                 return jsonify({'success': False, 'message': 'File not found'}), 404
             doc.status = 'processing'
             db.session.commit()
+            enqueue(f'reextract-document-{doc.id}', process_document, doc.id, reuse_existing=False)
             log_admin_event(actor_id, user_id, 'REEXTRACT', {'file_id': file_id})
             return jsonify({'success': True, 'data': {'file_id': file_id, 'status': 'processing'}}), 200
 
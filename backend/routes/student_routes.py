@@ -3,14 +3,32 @@ Student routes for profile management and document uploads.
 """
 import os
 import json
-from flask import Blueprint, request, jsonify, send_from_directory, session
+import time
+import mimetypes
+from flask import Blueprint, Response, request, jsonify, session, current_app, stream_with_context
 from werkzeug.utils import secure_filename
 from models import db, User, Document, UserProfile, ProfileVersion
 from sqlalchemy import text
+from sqlalchemy.orm import undefer
 from config import Config
 from functools import wraps
-import google.generativeai as genai
-import re
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from utils.job_queue import enqueue
+from utils.extraction import get_engine, ExtractionError
+from utils.extraction_cache import cached_extract
+from utils import profile_cache
+from utils.profile_scheduler import schedule_profile_refresh, get_profile_scheduler
+from utils.storage import save_stream, resolve_path, release_blob, remove_unreferenced_blob, send_stored_file
+from utils import chunked_upload
+from utils.schema_capabilities import schema_supports
+from utils.projection import parse_projection, load_columns, ProjectionError
+from utils.pagination import keyset_page, InvalidCursor
+from utils.user_stats import get_user_stats
+from utils.metrics import UPLOAD_STAGE_SECONDS, GEMINI_SECONDS, GEMINI_REQUESTS
+from utils.llm import get_llm_client, LLMUnavailable
+from utils.profile_chunks import split_chunks, merge_partial_profiles
+from utils.profile_reply import parse_profile_reply, ProfileFieldParser
 
 
 def login_required(f):
@@ -31,17 +49,6 @@ def get_current_user_id():
     """Get current user ID from session."""
     return session.get('user_id')
 
-try:
-    from PyPDF2 import PdfReader
-except Exception:
-    PdfReader = None
-
-try:
-    import pytesseract
-    from PIL import Image
-except Exception:
-    pytesseract = None
-    Image = None
 
 student_bp = Blueprint('student', __name__)
 
@@ -52,69 +59,46 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
 
-def extract_text_from_file(filepath: str) -> str:
-    """Extract text from PDF or image; returns empty string if unsupported or libs missing."""
-    try:
-        ext = os.path.splitext(filepath)[1].lower()
-        
-        if ext == '.pdf':
-            if PdfReader is None:
-                print("Warning: PyPDF2 not available, cannot extract text from PDF")
-                return ''
-            
-            text_parts = []
-            try:
-                with open(filepath, 'rb') as f:
-                    reader = PdfReader(f)
-                    num_pages = len(reader.pages)
-                    print(f"PDF has {num_pages} pages")
-                    
-                    for i, page in enumerate(reader.pages):
-                        try:
-                            page_text = page.extract_text()
-                            if page_text:
-                                text_parts.append(page_text)
-                                print(f"Extracted {len(page_text)} characters from page {i+1}")
-                        except Exception as e:
-                            print(f"Error extracting text from page {i+1}: {str(e)}")
-                            continue
-                    
-                    extracted = '\n'.join(text_parts).strip()
-                    print(f"Total extracted text length: {len(extracted)} characters")
-                    return extracted
-            except Exception as e:
-                print(f"Error reading PDF file {filepath}: {str(e)}")
-                return ''
-        
-        elif ext in ('.png', '.jpg', '.jpeg'):
-            if pytesseract is None or Image is None:
-                print("Warning: pytesseract or PIL not available, cannot extract text from image")
-                return ''
-            
-            try:
-                img = Image.open(filepath)
-                extracted = pytesseract.image_to_string(img)
-                if extracted:
-                    extracted = extracted.strip()
-                    print(f"Extracted {len(extracted)} characters from image using OCR")
-                return extracted
-            except Exception as e:
-                print(f"Error extracting text from image {filepath}: {str(e)}")
-                return ''
-        else:
-            print(f"Unsupported file extension: {ext}")
-            return ''
-            
-    except Exception as e:
-        print(f"Unexpected error in extract_text_from_file: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return ''
+def extract_text_from_file(filepath: str, ext: str | None = None, content_hash: str | None = None,
+                           use_cache: bool = True) -> str:
+    """Extract text from PDF or image.
+
+    ``ext`` overrides the extension of ``filepath`` (content-addressed blobs have none).
+    Results are cached by content hash and extractor settings. Raises
+    ``ExtractionError`` if the file cannot be extracted or only partially was
+    (timeout, failed page tasks); an empty string means the document has no text.
+    """
+    result = cached_extract(
+        get_engine(current_app.config), filepath, ext,
+        content_hash=content_hash,
+        max_bytes=current_app.config.get('EXTRACTION_CACHE_MAX_BYTES', 0),
+        use_cache=use_cache
+    )
+    if not result.get('complete', True):
+        reason = 'timed out' if result.get('timed_out') else f"{result.get('failed_tasks', 0)} page task(s) failed"
+        raise ExtractionError(f'incomplete extraction ({reason})')
+    return result['text']
 
 
 def generate_profile_with_gemini(extracted_text: str, variation_seed: int | None = None) -> dict:
+    """Generate a profile dict from ``extracted_text`` (empty dict on failure).
+
+    Results for identical prompts are memoized in ``profile_generation_cache``;
+    calls with an explicit ``variation_seed`` always go to the model. Text over
+    the ``PROFILE_CHUNK_TOKENS`` budget is summarized chunk by chunk and merged.
+    """
     seed_note = f"\nRegenerate a different variation if asked. Variation seed: {variation_seed}\n" if variation_seed is not None else "\n"
-    prompt = f"""
+    chunks = _profile_chunks(extracted_text)
+    if len(chunks) > 1:
+        partials = _map_profile_chunks(chunks)
+        if not partials:
+            return {}
+        return _reduce_partial_profiles(partials, seed_note, use_cache=variation_seed is None)
+    return _generate_profile(_profile_prompt(extracted_text, seed_note), use_cache=variation_seed is None)
+
+
+def _profile_prompt(extracted_text: str, seed_note: str) -> str:
+    return f"""
     Generate a one-page professional profile summarizing the user's skills, education,
     and achievements from this text. Return in strict JSON format:
     {{
@@ -130,67 +114,339 @@ def generate_profile_with_gemini(extracted_text: str, variation_seed: int | None
     Text: {extracted_text}
     {seed_note}
     """
-    try:
-        # Use the latest model
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
 
-        # Try standard .text first
-        raw = (getattr(response, 'text', '') or '').strip()
 
-        # Fallback: attempt to reconstruct text from candidates/parts if .text missing
-        if not raw:
-            try:
-                parts = []
-                for cand in getattr(response, 'candidates', []) or []:
-                    for part in getattr(cand, 'content', {}).get('parts', []):
-                        if isinstance(part, dict) and 'text' in part:
-                            parts.append(part['text'])
-                raw = '\n'.join(parts).strip()
-            except Exception:
-                pass
+def merge_profile_with_gemini(existing_profile: dict, new_text: str) -> dict:
+    """Merge one new document's text into an existing profile (empty dict on failure).
 
-        if not raw:
+    Only the current profile JSON and the new text are sent, so the prompt
+    size does not grow with the number of documents a user has uploaded.
+    A new document over the chunk budget is first condensed chunk by chunk.
+    """
+    chunks = _profile_chunks(new_text)
+    if len(chunks) > 1:
+        partials = _map_profile_chunks(chunks)
+        if not partials:
             return {}
+        new_text = json.dumps(merge_partial_profiles(partials), ensure_ascii=False)
+    prompt = f"""
+    Here is a user's current one-page professional profile as JSON:
+    {json.dumps(existing_profile, ensure_ascii=False)}
 
-        # Extract JSON block if wrapped in code fences
-        fence_match = re.search(r"```json\s*([\s\S]*?)\s*```", raw, re.IGNORECASE)
-        if fence_match:
-            raw_json = fence_match.group(1).strip()
-        else:
-            raw_json = raw
+    The user has uploaded a new document. Update the profile with any new
+    skills, education, certifications or achievements found in its text,
+    keep everything that is already there unless the new text corrects it,
+    and rewrite the summary to cover the merged profile. Return the complete
+    merged profile in strict JSON format with the same keys:
+    {{
+      "name": "",
+      "email": "",
+      "education": "",
+      "skills": [],
+      "certifications": [],
+      "achievements": [],
+      "summary": ""
+    }}
+
+    New document text: {new_text}
+    """
+    return _generate_profile(prompt, use_cache=True)
+
+
+def _profile_chunks(text: str) -> list:
+    config = current_app.config
+    return split_chunks(
+        text,
+        config.get('PROFILE_CHUNK_TOKENS', 8000),
+        config.get('PROFILE_CHUNK_OVERLAP_TOKENS', 200),
+        config.get('PROFILE_MAX_CHUNKS', 16)
+    )
+
+
+def _map_profile_chunks(chunks: list) -> list:
+    """Extract a partial profile from every chunk concurrently (empty list if any chunk fails).
+
+    Chunk prompts do not depend on the chunk's position, so chunks whose
+    text is unchanged are served from the generation cache on later runs.
+    """
+    app = current_app._get_current_object()
+
+    def extract(chunk):
+        prompt = f"""
+    Below is an excerpt from a user's documents. Extract only the information
+    that appears in this excerpt (leave fields empty otherwise) and summarize
+    the excerpt in one or two sentences. Return in strict JSON format:
+    {{
+      "name": "",
+      "email": "",
+      "education": "",
+      "skills": [],
+      "certifications": [],
+      "achievements": [],
+      "summary": ""
+    }}
+
+    Excerpt: {chunk}
+    """
+        with app.app_context():
+            return _generate_profile(prompt, use_cache=True)
+
+    started = time.perf_counter()
+    workers = min(len(chunks), get_llm_client().max_concurrency)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(extract, chunks))
+    failed = sum(1 for p in partials if not p or not isinstance(p, dict))
+    print(f"Profile map step: {len(chunks)} chunks in {time.perf_counter() - started:.1f}s, {failed} failed")
+    # A profile built from some of the chunks would silently drop content
+    return [] if failed else partials
+
+
+def _reduce_partial_profiles(partials: list, seed_note: str, use_cache: bool = True) -> dict:
+    """Merge chunk profiles into the final profile (deterministic merge if the model call fails)."""
+    merged = merge_partial_profiles(partials)
+    reduced = _generate_profile(_reduce_prompt(merged, seed_note), use_cache=use_cache)
+    if not reduced or not isinstance(reduced, dict):
+        print("Warning: Profile reduce step returned nothing, using merged chunk profiles")
+        return merged
+    return reduced
 
-        # Cleanup common artifacts and parse
-        raw_json = raw_json.strip()
+
+def _reduce_prompt(merged: dict, seed_note: str) -> str:
+    return f"""
+    These profile fragments were extracted from different parts of one user's
+    documents and combined: {json.dumps(merged, ensure_ascii=False)}
+
+    Turn them into a one-page professional profile: drop duplicates and
+    near-duplicates, keep the most complete education entry, and write one
+    summary covering everything. Return in strict JSON format with the same keys:
+    {{
+      "name": "",
+      "email": "",
+      "education": "",
+      "skills": [],
+      "certifications": [],
+      "achievements": [],
+      "summary": ""
+    }}
+    {seed_note}
+    """
+
+
+def _generate_profile(prompt: str, use_cache: bool = True) -> dict:
+    """Run ``prompt`` through the generation cache and the LLM provider."""
+    model_name = get_llm_client().model_name
+    ttl = current_app.config.get('PROFILE_CACHE_TTL', 0)
+    if use_cache:
         try:
-            return json.loads(raw_json)
-        except Exception:
-            # Try to find the first { ... } JSON object in the text
-            obj_match = re.search(r"\{[\s\S]*\}", raw_json)
-            if obj_match:
-                return json.loads(obj_match.group(0))
+            cached = profile_cache.lookup(model_name, prompt, ttl)
+            if cached:
+                print("Profile generation cache hit")
+                return cached
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: profile cache lookup failed: {str(e)}")
+
+    generated = _call_llm_for_profile(prompt)
+
+    if use_cache and generated and isinstance(generated, dict):
+        try:
+            profile_cache.store(model_name, prompt, generated)
+            profile_cache.evict(ttl, current_app.config.get('PROFILE_CACHE_MAX_ENTRIES', 0))
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: profile cache store failed: {str(e)}")
+    return generated
+
+
+def _call_llm_for_profile(prompt: str) -> dict:
+    """Send ``prompt`` to the LLM provider and parse the JSON profile out of the reply."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        try:
+            raw = get_llm_client().generate(prompt)
+        except LLMUnavailable as e:
+            outcome = 'unavailable'
+            print(f"Profile generation skipped: {str(e)}")
+            return {}
+
+        if not raw:
+            outcome = 'empty'
             return {}
+
+        outcome = 'parse_error'
+        parsed = parse_profile_reply(raw)
+        outcome = 'ok'
+        return parsed
     except Exception as e:
-        print(f"Gemini generation failed: {str(e)}")
+        print(f"LLM generation failed: {str(e)}")
         return {}
+    finally:
+        GEMINI_SECONDS.observe(time.perf_counter() - started, outcome)
+        GEMINI_REQUESTS.inc(outcome)
+
+
+def refresh_user_profile(user_id: int, new_document_ids: list | None = None):
+    """Regenerate and store the AI profile for a user.
+
+    With ``new_document_ids`` and an existing non-empty profile, only those
+    documents' text is merged into the stored profile (incremental mode).
+    Otherwise, or if the merge fails, the profile is rebuilt from all of the
+    user's extracted text.
+    """
+    try:
+        profile_json = None
+        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        existing = profile.profile_json if profile is not None else None
+        if isinstance(existing, str):
+            try:
+                existing = json.loads(existing)
+            except Exception:
+                existing = None
+
+        if new_document_ids and existing and isinstance(existing, dict) \
+                and current_app.config.get('PROFILE_INCREMENTAL', True):
+            new_docs = Document.query.options(undefer(Document.extracted_text)) \
+                .filter(Document.user_id == user_id, Document.id.in_(new_document_ids)).all()
+            new_text = ' '.join([(d.extracted_text or '') for d in new_docs]).strip()
+            if len(new_text) <= 10:
+                print(f"No new text in documents {new_document_ids}; keeping current profile")
+                return profile
+            print(f"Merging {len(new_text)} characters from documents {new_document_ids} into existing profile")
+            profile_json = merge_profile_with_gemini(existing, new_text)
+            if not profile_json or not isinstance(profile_json, dict):
+                print("Warning: Incremental merge returned nothing, falling back to full rebuild")
+                profile_json = None
+
+        if profile_json is None:
+            # Combine all extracted texts for this user
+            user_docs = Document.query.options(undefer(Document.extracted_text)).filter_by(user_id=user_id).all()
+            combined_text = ' '.join([(d.extracted_text or '') for d in user_docs]).strip()
+
+            if not combined_text or len(combined_text) <= 10:  # Ensure we have meaningful text
+                print(f"Warning: Not enough text extracted to generate profile (length: {len(combined_text) if combined_text else 0})")
+                return None
+
+            print(f"Generating profile from {len(combined_text)} characters of combined text")
+            profile_json = generate_profile_with_gemini(combined_text)
+
+        # Only save profile if generation was successful and returned data
+        if not profile_json or not isinstance(profile_json, dict) or len(profile_json) == 0:
+            print(f"Warning: Profile generation returned empty or invalid data")
+            return None
+
+        profile = UserProfile.query.filter_by(user_id=user_id).first()
+        if profile is None:
+            profile = UserProfile(user_id=user_id, profile_json=profile_json)
+            db.session.add(profile)
+        else:
+            profile.profile_json = profile_json
+        db.session.commit()
+        print(f"Profile generated and saved successfully")
+        return profile
+    except Exception as profile_error:
+        import traceback
+        print(f"Warning: Profile generation failed: {str(profile_error)}")
+        print(f"Traceback: {traceback.format_exc()}")
+        db.session.rollback()
+        return None
+
+
+def process_document(document_id: int, refresh_profile: bool = True, reuse_existing: bool = True):
+    """Background job: extract a document's text, then schedule a profile refresh for its owner.
+
+    Moves ``Document.status`` through ``processing`` to ``done`` or ``failed``;
+    unreadable files, timeouts and failed page tasks end ``failed`` so the
+    document can be re-extracted, while a document with no text ends ``done``.
+    With ``reuse_existing`` identical bytes are served from the extraction
+    cache; without it the file is extracted again and the cache refreshed.
+    """
+    document = Document.query.get(document_id)
+    if document is None:
+        print(f"Warning: Document {document_id} no longer exists, skipping")
+        return
+
+    document.status = 'processing'
+    db.session.commit()
+
+    try:
+        filepath = resolve_path(Config.UPLOAD_FOLDER, document.filepath)
+        with UPLOAD_STAGE_SECONDS.time('extract'):
+            extracted = extract_text_from_file(
+                filepath,
+                os.path.splitext(document.filename)[1],
+                content_hash=document.content_hash,
+                use_cache=reuse_existing
+            )
+        if extracted:
+            print(f"Text extracted: {len(extracted)} characters")
+        else:
+            print(f"Warning: No text extracted from file: {document.filename}")
+        document.extracted_text = extracted
+        document.status = 'done'
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Extraction failed for document {document_id}: {str(e)}")
+        document = Document.query.get(document_id)
+        if document is not None:
+            document.status = 'failed'
+            db.session.commit()
+        return
+
+    if refresh_profile:
+        schedule_profile_refresh(document.user_id, document_id=document.id)
+
+
+def process_documents(document_ids: list):
+    """Background job for a batch upload: extract each document, then request one profile refresh."""
+    processed = []
+    for document_id in document_ids:
+        process_document(document_id, refresh_profile=False)
+        document = Document.query.get(document_id)
+        if document is not None and document.status == 'done':
+            processed.append(document)
+    # Requests for the same user land in one debounce window: a single refresh per user
+    for document in processed:
+        schedule_profile_refresh(document.user_id, document_id=document.id)
+
+
+def resume_pending_documents() -> int:
+    """Re-enqueue processing for documents left ``uploaded``/``processing``.
+
+    The job queue lives in memory, so a restart or crash drops queued and
+    running jobs and their documents would otherwise never leave those
+    states. Called once at startup; returns the number of documents queued.
+    """
+    document_ids = [
+        document_id for document_id, in db.session.query(Document.id)
+        .filter(Document.status.in_(('uploaded', 'processing')))
+        .order_by(Document.id)
+    ]
+    for document_id in document_ids:
+        enqueue(f'process-document-{document_id}', process_document, document_id)
+    return len(document_ids)
 
 
 @student_bp.route('/api/ai-test', methods=['GET'])
 @student_bp.route('/api/test-ai', methods=['GET'])
 @login_required
 def ai_test():
-    """Simple endpoint to verify Gemini connectivity/model works."""
+    """Simple endpoint to verify the LLM provider/model works."""
     try:
-        test_prompt = "Return JSON: {\n  \"ok\": true,\n  \"model\": \"gemini-2.5-flash\"\n}"
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        resp = model.generate_content(test_prompt)
-        text = (getattr(resp, 'text', '') or '').strip()
+        client = get_llm_client()
+        test_prompt = "Return JSON: {\n  \"ok\": true,\n  \"model\": \"" + client.model_name + "\"\n}"
+        text = client.generate(test_prompt)
         return jsonify({
             'success': True,
             'data': {
+                'provider': client.provider.name,
+                'circuit': client.breaker.state(),
                 'raw_text': text[:500]
             }
         }), 200
+    except LLMUnavailable as e:
+        return jsonify({'success': False, 'message': f'AI test failed: {str(e)}'}), 503
     except Exception as e:
         return jsonify({'success': False, 'message': f'AI test failed: {str(e)}'}), 500
 
@@ -202,12 +458,13 @@ def regenerate_profile_self():
     try:
         uid = get_current_user_id()
         # Combine all extracted texts for this user
-        docs = Document.query.filter_by(user_id=uid).all()
+        docs = Document.query.options(undefer(Document.extracted_text)).filter_by(user_id=uid).all()
         combined = ' '.join([(d.extracted_text or '') for d in docs]).strip()
         if not combined or len(combined) <= 10:
             return jsonify({'success': False, 'message': 'Not enough readable text in documents to generate profile'}), 400
         import random
-        generated = generate_profile_with_gemini(combined, variation_seed=random.randint(1, 10_000_000))
+        with get_profile_scheduler().user_lock(uid):
+            generated = generate_profile_with_gemini(combined, variation_seed=random.randint(1, 10_000_000))
         if not generated or not isinstance(generated, dict) or len(generated) == 0:
             return jsonify({'success': False, 'message': 'Profile generation returned empty'}), 500
         # Upsert into user_profile
@@ -226,10 +483,107 @@ def regenerate_profile_self():
         return jsonify({'success': False, 'message': f'Failed to regenerate profile: {str(e)}'}), 500
 
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@student_bp.route('/api/profile/regenerate/stream', methods=['POST'])
+@login_required
+def regenerate_profile_stream():
+    """Regenerate the current user's profile, streaming progress as Server-Sent Events.
+
+    Events: ``stage`` (``map`` with the chunk count for large corpora, then
+    ``generate``), ``delta`` (model output as it arrives), ``field`` (one
+    profile field as soon as its value is complete) and finally ``done`` with
+    the persisted profile, or ``error``.
+    """
+    uid = get_current_user_id()
+    docs = Document.query.options(undefer(Document.extracted_text)).filter_by(user_id=uid).all()
+    combined = ' '.join([(d.extracted_text or '') for d in docs]).strip()
+    if not combined or len(combined) <= 10:
+        return jsonify({'success': False, 'message': 'Not enough readable text in documents to generate profile'}), 400
+    import random
+    seed_note = f"\nRegenerate a different variation if asked. Variation seed: {random.randint(1, 10_000_000)}\n"
+
+    def events():
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            with get_profile_scheduler().user_lock(uid):
+                chunks = _profile_chunks(combined)
+                if len(chunks) > 1:
+                    yield _sse('stage', {'stage': 'map', 'chunks': len(chunks)})
+                    partials = _map_profile_chunks(chunks)
+                    if not partials:
+                        yield _sse('error', {'message': 'Profile generation returned empty'})
+                        return
+                    prompt = _reduce_prompt(merge_partial_profiles(partials), seed_note)
+                else:
+                    prompt = _profile_prompt(combined, seed_note)
+                yield _sse('stage', {'stage': 'generate'})
+
+                parser = ProfileFieldParser()
+                with closing(get_llm_client().stream(prompt)) as pieces:
+                    for piece in pieces:
+                        yield _sse('delta', {'text': piece})
+                        for key, value in parser.feed(piece):
+                            yield _sse('field', {'key': key, 'value': value})
+                if not parser.text.strip():
+                    outcome = 'empty'
+                    yield _sse('error', {'message': 'Profile generation returned empty'})
+                    return
+                outcome = 'parse_error'
+                generated = parse_profile_reply(parser.text)
+                outcome = 'ok'
+
+                profile = UserProfile.query.filter_by(user_id=uid).first()
+                if profile is None:
+                    profile = UserProfile(user_id=uid, profile_json=generated)
+                    db.session.add(profile)
+                else:
+                    profile.profile_json = generated
+                db.session.commit()
+            yield _sse('done', {'profile': {'user_id': uid, 'profile_json': generated}})
+        except LLMUnavailable as e:
+            outcome = 'unavailable'
+            yield _sse('error', {'message': str(e)})
+        except GeneratorExit:
+            # Client went away; closing the model stream frees its slot
+            outcome = 'cancelled'
+            raise
+        except Exception as e:
+            db.session.rollback()
+            print(f"Streaming profile generation failed: {str(e)}")
+            yield _sse('error', {'message': f'Failed to regenerate profile: {str(e)}'})
+        finally:
+            GEMINI_SECONDS.observe(time.perf_counter() - started, outcome)
+            GEMINI_REQUESTS.inc(outcome)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def document_page(user_id: int, fields: tuple):
+    """One page of the user's documents, newest first, from ``limit``/``cursor`` query args.
+
+    A missing or non-numeric ``limit`` falls back to 50; it is clamped to 1..100.
+
+    Returns ``(documents, next_cursor, limit, document_count)``; the count comes
+    from the ``user_stats`` rollup so no rows are counted or fetched for it.
+    Raises ``InvalidCursor`` for a malformed cursor.
+    """
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
+    cursor = request.args.get('cursor') or None
+    q = Document.query.options(load_columns(Document, fields, 'uploaded_at')).filter_by(user_id=user_id)
+    documents, next_cursor = keyset_page(q, Document.uploaded_at, Document.id, True, limit, cursor=cursor)
+    stats = get_user_stats([user_id]).get(user_id)
+    return documents, next_cursor, limit, stats.files_total if stats else 0
+
+
 @student_bp.route('/api/profile', methods=['GET'])
 @login_required
 def get_profile():
-    """Get current student's profile and uploaded documents."""
+    """Get current student's profile and a page of uploaded documents."""
     try:
         user_id = get_current_user_id()
         
@@ -240,15 +594,20 @@ def get_profile():
                 'message': 'User not found'
             }), 404
         
-        # Get all documents for the user
-        documents = Document.query.filter_by(user_id=user_id).all()
+        try:
+            fields = parse_projection(request.args, Document.ALL_FIELDS, Document.DEFAULT_FIELDS)
+            documents, next_cursor, limit, document_count = document_page(user_id, fields)
+        except (ProjectionError, InvalidCursor) as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         
         return jsonify({
             'success': True,
             'data': {
                 'user': user.to_dict(),
-                'documents': [doc.to_dict() for doc in documents],
-                'document_count': len(documents)
+                'documents': [doc.to_dict(fields) for doc in documents],
+                'document_count': document_count,
+                'limit': limit,
+                'next_cursor': next_cursor
             }
         }), 200
     
@@ -259,6 +618,33 @@ def get_profile():
         }), 500
 
 
+def create_document(user_id: int, filename: str, mime_type: str | None, content_hash: str,
+                    size_bytes: int, relpath: str) -> Document:
+    """Insert the Document row for a stored blob and queue its processing.
+
+    Text extraction and profile generation happen on the background queue.
+    Releases the blob reservation taken when the file was stored.
+    """
+    try:
+        document = Document(
+            user_id=user_id,
+            filename=filename,
+            filepath=relpath,
+            content_hash=content_hash,
+            mime_type=mime_type,
+            size_bytes=size_bytes,
+            status='uploaded'
+        )
+        db.session.add(document)
+        with UPLOAD_STAGE_SECONDS.time('db_commit'):
+            db.session.commit()
+    finally:
+        release_blob(content_hash)
+
+    enqueue(f'process-document-{document.id}', process_document, document.id)
+    return document
+
+
 @student_bp.route('/api/upload', methods=['POST'])
 @login_required
 def upload_document():
@@ -289,84 +675,21 @@ def upload_document():
                 'message': 'Invalid file type. Allowed: pdf, png, jpg, jpeg'
             }), 400
         
-        # Secure the filename and add user_id prefix
         filename = secure_filename(file.filename)
-        filename_with_prefix = f"{user_id}_{filename}"
-        
-        # Get absolute path to upload folder
-        upload_dir = Config.UPLOAD_FOLDER
-        
-        # Ensure upload folder exists
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
         
-        # Save file with absolute path
-        filepath = os.path.join(upload_dir, filename_with_prefix)
-        file.save(filepath)
-        
-        # Extract text from the uploaded file (use absolute path for extraction)
-        extracted = extract_text_from_file(filepath)
-        
-        # Log extraction result for debugging
-        if extracted:
-            print(f"Text extracted: {len(extracted)} characters")
-        else:
-            print(f"Warning: No text extracted from file: {filename}")
-
-        # Create document record (store filename with prefix in DB)
-        document = Document(
-            user_id=user_id,
-            filename=filename,
-            filepath=filename_with_prefix,  # Store just the filename for easier access
-            extracted_text=extracted
-        )
-        
-        db.session.add(document)
-        db.session.commit()
-
-        # Generate or update AI profile (non-blocking - don't fail upload if this fails)
-        profile_dict = None
-        try:
-            # Combine all extracted texts for this user
-            user_docs = Document.query.filter_by(user_id=user_id).all()
-            combined_text = ' '.join([(d.extracted_text or '') for d in user_docs]).strip()
-
-            if combined_text and len(combined_text) > 10:  # Ensure we have meaningful text
-                print(f"Generating profile from {len(combined_text)} characters of combined text")
-                profile_json = generate_profile_with_gemini(combined_text)
-                
-                # Only save profile if generation was successful and returned data
-                if profile_json and isinstance(profile_json, dict) and len(profile_json) > 0:
-                    profile = UserProfile.query.filter_by(user_id=user_id).first()
-                    
-                    if profile is None:
-                        profile = UserProfile(user_id=user_id, profile_json=profile_json)
-                        db.session.add(profile)
-                    else:
-                        profile.profile_json = profile_json
-                    db.session.commit()
-                    
-                    profile_dict = profile.to_dict()
-                    print(f"Profile generated and saved successfully")
-                else:
-                    print(f"Warning: Profile generation returned empty or invalid data")
-            else:
-                print(f"Warning: Not enough text extracted to generate profile (length: {len(combined_text) if combined_text else 0})")
-        except Exception as profile_error:
-            # If profile generation fails, don't fail the upload
-            import traceback
-            print(f"Warning: Profile generation failed: {str(profile_error)}")
-            print(f"Traceback: {traceback.format_exc()}")
-            db.session.rollback()
+        # Stream into the content-addressed blob store (hashing as we write)
+        with UPLOAD_STAGE_SECONDS.time('save'):
+            content_hash, size_bytes, relpath = save_stream(file.stream, Config.UPLOAD_FOLDER)
+        document = create_document(user_id, filename, file.mimetype, content_hash, size_bytes, relpath)
         
         return jsonify({
             'success': True,
-            'message': 'File uploaded successfully' + (' and profile updated' if profile_dict else ''),
+            'message': 'File uploaded successfully; processing has started',
             'data': {
                 'document': document.to_dict(),
-                'profile': profile_dict
+                'profile': None
             }
-        }), 201
+        }), 202
     
     except Exception as e:
         import traceback
@@ -381,19 +704,259 @@ def upload_document():
         }), 500
 
 
+@student_bp.route('/api/upload/batch', methods=['POST'])
+@login_required
+def upload_documents_batch():
+    """Upload several documents in one multipart request.
+
+    Files are sent as repeated ``documents`` fields. All of them are
+    validated before anything is written; the rows are inserted in one
+    transaction and processed by a single background job.
+    """
+    try:
+        user_id = get_current_user_id()
+        
+        files = [f for f in request.files.getlist('documents') if f and f.filename]
+        if not files:
+            return jsonify({
+                'success': False,
+                'message': 'No files provided'
+            }), 400
+        
+        max_files = current_app.config.get('BATCH_UPLOAD_MAX_FILES', 50)
+        if len(files) > max_files:
+            return jsonify({
+                'success': False,
+                'message': f'Too many files in one batch (max {max_files})'
+            }), 400
+        
+        # Validate every file up front so a bad one does not leave a partial batch
+        rejected = [f.filename for f in files if not allowed_file(f.filename)]
+        if rejected:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid file type. Allowed: pdf, png, jpg, jpeg',
+                'data': {'rejected': rejected}
+            }), 400
+        
+        # Stream all files into the blob store concurrently
+        upload_dir = Config.UPLOAD_FOLDER
+        stored = []
+        committed = False
+        try:
+            with UPLOAD_STAGE_SECONDS.time('save'), ThreadPoolExecutor(max_workers=min(len(files), 8)) as pool:
+                futures = [pool.submit(save_stream, f.stream, upload_dir) for f in files]
+                # Collect every save that finished, so one failure does not orphan the others' blobs
+                errors = []
+                for future in futures:
+                    try:
+                        stored.append(future.result())
+                    except Exception as e:
+                        errors.append(e)
+            if errors:
+                raise errors[0]
+            
+            documents = [
+                Document(
+                    user_id=user_id,
+                    filename=secure_filename(f.filename),
+                    filepath=relpath,
+                    content_hash=content_hash,
+                    mime_type=f.mimetype,
+                    size_bytes=size_bytes,
+                    status='uploaded'
+                )
+                for f, (content_hash, size_bytes, relpath) in zip(files, stored)
+            ]
+            db.session.add_all(documents)
+            with UPLOAD_STAGE_SECONDS.time('db_commit'):
+                db.session.commit()
+            committed = True
+        finally:
+            for content_hash, _, _ in stored:
+                release_blob(content_hash)
+            if not committed:
+                db.session.rollback()
+                for content_hash, relpath in {(h, r) for h, _, r in stored}:
+                    is_referenced = lambda h=content_hash: db.session.query(Document.id).filter(
+                        Document.content_hash == h).first() is not None
+                    remove_unreferenced_blob(upload_dir, relpath, content_hash, is_referenced)
+        
+        document_ids = [d.id for d in documents]
+        enqueue(f'process-batch-{document_ids[0]}-{document_ids[-1]}', process_documents, document_ids)
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(documents)} file(s) uploaded successfully; processing has started',
+            'data': {
+                'documents': [d.to_dict() for d in documents]
+            }
+        }), 202
+    
+    except Exception as e:
+        import traceback
+        db.session.rollback()
+        print(f"Batch upload error: {str(e)}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return jsonify({
+            'success': False,
+            'message': f'Batch upload failed: {str(e)}'
+        }), 500
+
+
+def _chunked_session_or_error(upload_id: str):
+    """Load a chunked upload session owned by the current user, or an error response."""
+    meta = chunked_upload.get_session(Config.UPLOAD_FOLDER, upload_id)
+    if meta is None or meta['user_id'] != get_current_user_id():
+        return None, (jsonify({'success': False, 'message': 'Upload session not found'}), 404)
+    return meta, None
+
+
+def _chunked_session_dict(meta: dict) -> dict:
+    return {
+        'upload_id': meta['upload_id'],
+        'filename': meta['filename'],
+        'total_size': meta['total_size'],
+        'chunk_size': meta['chunk_size'],
+        'offset': meta['offset'],
+        'next_chunk': meta['offset'] // meta['chunk_size'],
+    }
+
+
+@student_bp.route('/api/upload/chunked', methods=['POST'])
+@login_required
+def chunked_upload_init():
+    """Start a resumable upload: ``{filename, size}`` -> upload id and chunk size."""
+    try:
+        data = request.get_json(silent=True) or {}
+        filename = secure_filename(data.get('filename') or '')
+        if not filename or not allowed_file(filename):
+            return jsonify({
+                'success': False,
+                'message': 'Invalid file type. Allowed: pdf, png, jpg, jpeg'
+            }), 400
+        
+        total_size = data.get('size')
+        max_bytes = current_app.config.get('CHUNKED_UPLOAD_MAX_BYTES')
+        if total_size is not None:
+            if not isinstance(total_size, int) or total_size < 0:
+                return jsonify({'success': False, 'message': 'size must be a non-negative integer'}), 400
+            if total_size > max_bytes:
+                return jsonify({'success': False, 'message': f'File too large (max {max_bytes} bytes)'}), 413
+        
+        meta = chunked_upload.create_session(
+            Config.UPLOAD_FOLDER,
+            get_current_user_id(),
+            filename,
+            total_size,
+            current_app.config.get('CHUNKED_UPLOAD_CHUNK_SIZE')
+        )
+        return jsonify({'success': True, 'data': {'upload': _chunked_session_dict(meta)}}), 201
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Failed to start upload: {str(e)}'}), 500
+
+
+@student_bp.route('/api/upload/chunked/<upload_id>', methods=['GET'])
+@login_required
+def chunked_upload_status(upload_id):
+    """Report the acknowledged offset so a client can resume."""
+    meta, error = _chunked_session_or_error(upload_id)
+    if error:
+        return error
+    return jsonify({'success': True, 'data': {'upload': _chunked_session_dict(meta)}}), 200
+
+
+@student_bp.route('/api/upload/chunked/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@login_required
+def chunked_upload_put(upload_id, index: int):
+    """Append chunk ``index`` (raw request body) to the upload."""
+    meta, error = _chunked_session_or_error(upload_id)
+    if error:
+        return error
+    try:
+        meta = chunked_upload.append_chunk(
+            Config.UPLOAD_FOLDER, meta, index, request.stream,
+            current_app.config.get('CHUNKED_UPLOAD_MAX_BYTES')
+        )
+        return jsonify({'success': True, 'data': {'upload': _chunked_session_dict(meta)}}), 200
+    except chunked_upload.ChunkError as e:
+        meta = chunked_upload.get_session(Config.UPLOAD_FOLDER, upload_id) or meta
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'data': {'upload': _chunked_session_dict(meta)}
+        }), 409
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Failed to store chunk: {str(e)}'}), 500
+
+
+@student_bp.route('/api/upload/chunked/<upload_id>/complete', methods=['POST'])
+@login_required
+def chunked_upload_complete(upload_id):
+    """Finish a chunked upload and create the Document like a regular upload."""
+    meta, error = _chunked_session_or_error(upload_id)
+    if error:
+        return error
+    try:
+        content_hash, size_bytes, relpath = chunked_upload.finalize_session(Config.UPLOAD_FOLDER, meta)
+        document = create_document(
+            meta['user_id'],
+            meta['filename'],
+            mimetypes.guess_type(meta['filename'])[0],
+            content_hash,
+            size_bytes,
+            relpath
+        )
+        return jsonify({
+            'success': True,
+            'message': 'File uploaded successfully; processing has started',
+            'data': {
+                'document': document.to_dict(),
+                'profile': None
+            }
+        }), 202
+    except chunked_upload.ChunkError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'data': {'upload': _chunked_session_dict(meta)}
+        }), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Upload failed: {str(e)}'}), 500
+
+
+@student_bp.route('/api/upload/chunked/<upload_id>', methods=['DELETE'])
+@login_required
+def chunked_upload_abort(upload_id):
+    """Discard an unfinished chunked upload."""
+    meta, error = _chunked_session_or_error(upload_id)
+    if error:
+        return error
+    chunked_upload.abort_session(Config.UPLOAD_FOLDER, meta['upload_id'])
+    return jsonify({'success': True, 'message': 'Upload cancelled'}), 200
+
+
 @student_bp.route('/api/documents', methods=['GET'])
 @login_required
 def get_documents():
-    """Get all documents for the current student."""
+    """Get the current student's documents, newest first (cursor-paginated)."""
     try:
         user_id = get_current_user_id()
         
-        documents = Document.query.filter_by(user_id=user_id).order_by(Document.uploaded_at.desc()).all()
+        try:
+            fields = parse_projection(request.args, Document.ALL_FIELDS, Document.DEFAULT_FIELDS)
+            documents, next_cursor, limit, document_count = document_page(user_id, fields)
+        except (ProjectionError, InvalidCursor) as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         
         return jsonify({
             'success': True,
             'data': {
-                'documents': [doc.to_dict() for doc in documents]
+                'documents': [doc.to_dict(fields) for doc in documents],
+                'document_count': document_count,
+                'limit': limit,
+                'next_cursor': next_cursor
             }
         }), 200
     
@@ -411,7 +974,13 @@ def get_document(doc_id):
     try:
         user_id = get_current_user_id()
         
-        document = Document.query.get_or_404(doc_id)
+        try:
+            # Single document: the text is part of the default payload here
+            fields = parse_projection(request.args, Document.ALL_FIELDS, Document.ALL_FIELDS)
+        except ProjectionError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        document = Document.query.options(load_columns(Document, fields, 'user_id')).filter_by(id=doc_id).first_or_404()
         
         # Check if document belongs to the user (admins can view any)
         requester_role = session.get('user_role')
@@ -424,7 +993,7 @@ def get_document(doc_id):
         return jsonify({
             'success': True,
             'data': {
-                'document': document.to_dict()
+                'document': document.to_dict(fields)
             }
         }), 200
     
@@ -452,15 +1021,14 @@ def download_document(doc_id):
                 'message': 'Unauthorized access'
             }), 403
         
-        # Get absolute path for file serving
-        upload_dir = Config.UPLOAD_FOLDER
-        file_basename = os.path.basename(document.filepath)
-        
-        # Send file
-        return send_from_directory(
-            upload_dir,
-            file_basename,
-            as_attachment=True
+        # Send file (blobs have no extension, so name/type come from the original filename);
+        # supports Range requests and If-None-Match against the content hash
+        return send_stored_file(
+            Config.UPLOAD_FOLDER,
+            document.filepath,
+            download_name=document.filename,
+            as_attachment=request.args.get('inline') != '1',
+            max_age=current_app.config.get('DOWNLOAD_CACHE_MAX_AGE', 31536000)
         )
     
     except Exception as e:
@@ -487,21 +1055,22 @@ def delete_document(doc_id):
                 'message': 'Unauthorized access'
             }), 403
         
-        # Delete physical file from disk
-        upload_dir = Config.UPLOAD_FOLDER
-        file_basename = os.path.basename(document.filepath)
-        file_path = os.path.join(upload_dir, file_basename)
-        
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                print(f"Warning: Could not delete physical file {file_path}: {str(e)}")
-        
         # Delete database record
+        filepath = document.filepath
+        content_hash = document.content_hash
+        owner_id = document.user_id
         db.session.delete(document)
         db.session.commit()
         
+        # A removed document cannot be merged out incrementally: rebuild in full
+        schedule_profile_refresh(owner_id, full=True)
+        
+        # Delete physical file from disk unless another document shares the blob
+        # (content_hash is indexed; only legacy rows without a hash fall back to filepath)
+        ref = Document.content_hash == content_hash if content_hash else Document.filepath == filepath
+        is_referenced = lambda: db.session.query(Document.id).filter(ref).first() is not None
+        remove_unreferenced_blob(Config.UPLOAD_FOLDER, filepath, content_hash, is_referenced)
+        
         return jsonify({
             'success': True,
             'message': 'Document deleted successfully'
@@ -537,10 +1106,11 @@ def get_ai_profile(user_id: int):
         if not row:
             # No profile row yet: try on-demand generation from existing docs
             try:
-                docs = Document.query.filter_by(user_id=user_id).all()
+                docs = Document.query.options(undefer(Document.extracted_text)).filter_by(user_id=user_id).all()
                 combined = ' '.join([(d.extracted_text or '') for d in docs]).strip()
                 if combined and len(combined) > 10:
-                    generated = generate_profile_with_gemini(combined)
+                    with get_profile_scheduler().user_lock(user_id):
+                        generated = generate_profile_with_gemini(combined)
                     if generated and isinstance(generated, dict) and len(generated) > 0:
                         try:
                             db.session.execute(
@@ -562,11 +1132,8 @@ def get_ai_profile(user_id: int):
         # Try to use versioned profile if available, otherwise fallback to user_profile.profile_json
         profile_json = None
         try:
-            # Only attempt versioned read if the table likely exists
-            current_pointer = db.session.execute(
-                text("SELECT current_version FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_profile' AND COLUMN_NAME = 'current_version'")
-            ).first()
-            if current_pointer:
+            # Only attempt versioned read if the migration has been applied
+            if schema_supports('versioned_profiles'):
                 # If column exists, read pointer and fetch versioned row
                 ptr_row = db.session.execute(
                     text("SELECT current_version FROM user_profile WHERE user_id = :uid LIMIT 1"),
@@ -585,10 +1152,11 @@ def get_ai_profile(user_id: int):
         # If still empty, attempt on-demand generation from existing documents
         if not profile_json or (isinstance(profile_json, dict) and len(profile_json) == 0):
             try:
-                docs = Document.query.filter_by(user_id=user_id).all()
+                docs = Document.query.options(undefer(Document.extracted_text)).filter_by(user_id=user_id).all()
                 combined = ' '.join([(d.extracted_text or '') for d in docs]).strip()
                 if combined and len(combined) > 10:
-                    generated = generate_profile_with_gemini(combined)
+                    with get_profile_scheduler().user_lock(user_id):
+                        generated = generate_profile_with_gemini(combined)
                     if generated and isinstance(generated, dict) and len(generated) > 0:
                         # Persist result to user_profile (non-versioned fallback)
                         try:
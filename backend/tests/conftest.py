@@ -0,0 +1,89 @@
+"""
+Shared fixtures: one app per test session on a throwaway SQLite database.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import time
+import itertools
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_WORKDIR = tempfile.mkdtemp(prefix='doclocker-tests-')
+# Must be set before config.py is imported
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_WORKDIR, 'test.db')}"
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from config import Config
+    Config.UPLOAD_FOLDER = os.path.join(_WORKDIR, 'uploads')
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+    app.extensions['activity_tracker'].shutdown()
+    app.extensions['job_queue'].shutdown()
+    from utils.extraction import get_engine
+    get_engine().shutdown()
+    shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def app_ctx(app):
+    with app.app_context():
+        yield
+        from models import db
+        db.session.rollback()
+
+
+@pytest.fixture
+def make_user(app_ctx):
+    """Create and commit a student; returns the ``User``."""
+    from models import db, User
+
+    def make(**kwargs):
+        n = next(_emails)
+        user = User(name=kwargs.pop('name', f'Student {n}'), email=f'student{n}@example.com',
+                    password='secret', role='student', **kwargs)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    response = client.post('/api/login', json={'email': 'admin@doclocker.com', 'password': 'admin123'})
+    assert response.status_code == 200
+    return client
+
+
+@pytest.fixture
+def student_client(app):
+    """A test client logged in as a freshly signed-up student."""
+    client = app.test_client()
+    n = next(_emails)
+    response = client.post('/api/signup', json={'name': f'Student {n}', 'email': f'student{n}@example.com',
+                                                'password': 'secret'})
+    assert response.status_code == 201
+    yield client
+    # Background extraction of this test's uploads must not touch later tests' rows
+    wait_for_jobs(app)
+
+
+def wait_for_jobs(app):
+    jobs = app.extensions['job_queue']
+    scheduler = app.extensions['profile_scheduler']
+    while True:
+        jobs.join()
+        if scheduler.pending() == 0 and jobs.depth() == 0 and jobs.active() == 0:
+            return
+        time.sleep(0.02)
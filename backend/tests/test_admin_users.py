@@ -0,0 +1,59 @@
+"""
+GET /api/admin/users must issue the same number of statements whatever the
+page size (no per-user count queries).
+"""
+import threading
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from models import db, Document, ProfileVersion
+
+
+@contextmanager
+def count_statements(engine):
+    """Count statements issued by this thread (background jobs are ignored)."""
+    counted = []
+    thread = threading.get_ident()
+
+    def before_cursor_execute(*args):
+        if threading.get_ident() == thread:
+            counted.append(1)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counted
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def students(make_user):
+    users = [make_user() for _ in range(120)]
+    for n, user in enumerate(users):
+        for i in range(n % 3 + 1):
+            db.session.add(Document(user_id=user.id, filename=f'doc{i}.pdf', filepath=f'aa/{user.id}-{i}',
+                                    status='failed' if i == 1 else 'done'))
+        if n % 2:
+            db.session.add(ProfileVersion(user_id=user.id, version=1, profile_json={}))
+    db.session.commit()
+    return users
+
+
+def _statements(app, client, url):
+    response = client.get(url)  # warm-up: fills any missing user_stats rows
+    assert response.status_code == 200
+    with count_statements(db.engine) as counted:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(counted), response.get_json()['data']
+
+
+@pytest.mark.parametrize('mode', ['page=1', 'cursor=', 'cursor=&include_total=1'])
+def test_query_count_does_not_grow_with_page_size(app, admin_client, students, mode):
+    small, small_data = _statements(app, admin_client, f'/api/admin/users?limit=10&{mode}')
+    large, large_data = _statements(app, admin_client, f'/api/admin/users?limit=100&{mode}')
+    assert len(small_data['users']) == 10
+    assert len(large_data['users']) == 100
+    assert 0 < small == large
@@ -0,0 +1,22 @@
+"""
+Query-string validation of the student document listings.
+"""
+import pytest
+
+
+@pytest.mark.parametrize('url', ['/api/documents', '/api/profile'])
+@pytest.mark.parametrize('limit, expected', [('abc', 50), ('', 50), ('0', 1), ('500', 100), ('7', 7)])
+def test_limit_is_parsed_defensively(student_client, url, limit, expected):
+    response = student_client.get(f'{url}?limit={limit}')
+    assert response.status_code == 200
+    assert response.get_json()['data']['limit'] == expected
+
+
+def test_invalid_cursor_is_rejected(student_client):
+    response = student_client.get('/api/documents?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('query', ['page=abc', 'limit=abc', 'page=-3'])
+def test_admin_lists_parse_page_arguments(admin_client, query):
+    assert admin_client.get(f'/api/admin/users?{query}').status_code == 200
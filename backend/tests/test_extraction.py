@@ -0,0 +1,85 @@
+"""
+ExtractionEngine must report failed and unfinished page tasks instead of
+silently returning partial text. Builtins stand in for page workers so the
+spawned children need nothing from this module.
+"""
+import os
+import time
+
+import pytest
+
+from utils.extraction import ExtractionEngine, ExtractionError
+
+
+def _page(i):
+    return (list, ([(i, f'page {i} text', 'text', 0.0)],))
+
+
+def _engine(tasks, timeout=20):
+    engine = ExtractionEngine(max_workers=2, timeout=timeout)
+    engine._plan = lambda filepath, ext: (tasks, len(tasks))
+    return engine
+
+
+@pytest.fixture
+def run():
+    engines = []
+
+    def run(tasks, **kwargs):
+        engine = _engine(tasks, **kwargs)
+        engines.append(engine)
+        return engine.extract('doc.pdf')
+    yield run
+    for engine in engines:
+        engine.shutdown()
+
+
+def test_complete_run(run):
+    result = run([_page(0), _page(1)])
+    assert result['complete']
+    assert result['text'] == 'page 0 text\npage 1 text'
+
+
+def test_failed_task_keeps_other_pages(run):
+    # int('x') raises ValueError in the worker; the pages after it must still be collected
+    result = run([_page(0), (int, ('x',)), _page(2)])
+    assert not result['complete']
+    assert result['failed_tasks'] == 1
+    assert [p['page'] for p in result['pages']] == [1, 3]
+
+
+def test_worker_crash_is_reported(run):
+    result = run([_page(0), (os._exit, (1,)), _page(2)])
+    assert not result['complete']
+    assert result['failed_tasks'] >= 1
+
+
+def test_timeout_is_reported(run):
+    started = time.monotonic()
+    result = run([_page(0), (time.sleep, (30,))], timeout=3)
+    assert time.monotonic() - started < 15
+    assert result['timed_out'] and not result['complete']
+    assert result['text'] == 'page 0 text'
+
+
+def test_nothing_extracted_raises(run):
+    with pytest.raises(ExtractionError):
+        run([(int, ('x',))])
+
+
+def test_missing_tesseract_keeps_pool_usable(tmp_path, monkeypatch):
+    from PIL import Image
+    image = tmp_path / 'scan.png'
+    Image.new('RGB', (20, 20), 'white').save(image)
+    # Workers are spawned with this PATH, so pytesseract cannot find the binary
+    monkeypatch.setenv('PATH', str(tmp_path))
+    engine = ExtractionEngine(max_workers=1)
+    try:
+        with pytest.raises(ExtractionError, match='tesseract'):
+            engine.extract(str(image))
+        pool = engine._pool
+        engine._plan = lambda filepath, ext: ([_page(0)], 1)
+        assert engine.extract('doc.pdf')['complete']
+        assert engine._pool is pool
+    finally:
+        engine.shutdown()
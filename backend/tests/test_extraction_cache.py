@@ -0,0 +1,47 @@
+"""
+Only complete extraction results may be cached.
+"""
+import itertools
+
+from utils.extraction_cache import cached_extract, lookup
+
+_hashes = itertools.count(1)
+
+
+class FakeEngine:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def settings(self):
+        return {'version': 1}
+
+    def extract(self, filepath, ext=None):
+        self.calls += 1
+        return dict(self.result)
+
+
+def _hash():
+    return f'{next(_hashes):064x}'
+
+
+def test_incomplete_result_is_not_cached(app_ctx):
+    content_hash = _hash()
+    engine = FakeEngine({'text': 'page 0 text', 'pages': [{'page': 1}], 'timed_out': False,
+                         'failed_tasks': 1, 'complete': False})
+    result = cached_extract(engine, 'doc.pdf', content_hash=content_hash)
+    assert not result['complete']
+    assert lookup(content_hash, engine.settings()) is None
+
+    cached_extract(engine, 'doc.pdf', content_hash=content_hash)
+    assert engine.calls == 2
+
+
+def test_complete_result_is_cached(app_ctx):
+    content_hash = _hash()
+    engine = FakeEngine({'text': 'all pages', 'pages': [{'page': 1}, {'page': 2}], 'timed_out': False,
+                         'failed_tasks': 0, 'complete': True})
+    cached_extract(engine, 'doc.pdf', content_hash=content_hash)
+    hit = cached_extract(engine, 'doc.pdf', content_hash=content_hash)
+    assert engine.calls == 1
+    assert hit['cached'] and hit['complete'] and hit['text'] == 'all pages'
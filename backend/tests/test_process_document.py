@@ -0,0 +1,72 @@
+"""
+Extraction failures must leave a document 'failed'; only a readable document
+without text ends 'done' with empty text.
+"""
+import io
+import os
+import uuid
+
+from PyPDF2 import PdfWriter
+
+from config import Config
+from models import db, Document
+from routes.student_routes import process_document, resume_pending_documents
+from conftest import wait_for_jobs
+
+
+def _document(user, filename, data):
+    relpath = uuid.uuid4().hex
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+    with open(os.path.join(Config.UPLOAD_FOLDER, relpath), 'wb') as f:
+        f.write(data)
+    document = Document(user_id=user.id, filename=filename, filepath=relpath, status='uploaded')
+    db.session.add(document)
+    db.session.commit()
+    return document.id
+
+
+def _status(document_id):
+    db.session.expire_all()
+    return db.session.get(Document, document_id)
+
+
+def test_corrupt_pdf_is_failed(make_user):
+    document_id = _document(make_user(), 'transcript.pdf', b'%PDF-1.4 this is not a pdf')
+    process_document(document_id, refresh_profile=False)
+    assert _status(document_id).status == 'failed'
+
+
+def test_missing_file_is_failed(make_user):
+    user = make_user()
+    document = Document(user_id=user.id, filename='gone.pdf', filepath='does-not-exist', status='uploaded')
+    db.session.add(document)
+    db.session.commit()
+    process_document(document.id, refresh_profile=False)
+    assert _status(document.id).status == 'failed'
+
+
+def test_blank_pdf_is_done_with_empty_text(make_user):
+    writer = PdfWriter()
+    writer.add_blank_page(200, 200)
+    out = io.BytesIO()
+    writer.write(out)
+    document_id = _document(make_user(), 'blank.pdf', out.getvalue())
+    process_document(document_id, refresh_profile=False)
+    document = _status(document_id)
+    assert document.status == 'done'
+    assert not document.extracted_text
+
+
+def test_unfinished_documents_are_requeued(app, make_user):
+    user = make_user()
+    # Left behind by a process that stopped mid-job
+    stuck = [_document(user, f'{status}.pdf', b'%PDF-1.4 this is not a pdf') for status in ('uploaded', 'processing')]
+    db.session.get(Document, stuck[1]).status = 'processing'
+    finished = _document(user, 'done.pdf', b'%PDF-1.4 this is not a pdf')
+    db.session.get(Document, finished).status = 'done'
+    db.session.commit()
+
+    assert resume_pending_documents() >= 2
+    wait_for_jobs(app)
+    assert [_status(i).status for i in stuck] == ['failed', 'failed']
+    assert _status(finished).status == 'done'
@@ -0,0 +1,67 @@
+"""
+Shared blobs are removed only when nothing references them.
+"""
+import io
+import os
+
+from config import Config
+from utils.storage import save_stream, release_blob, remove_unreferenced_blob, resolve_path
+
+
+def test_pending_upload_keeps_blob(app, tmp_path):
+    content_hash, _, relpath = save_stream(io.BytesIO(b'same bytes'), str(tmp_path))
+    path = resolve_path(str(tmp_path), relpath)
+
+    # An upload of these bytes has stored the blob but not yet committed its row
+    assert not remove_unreferenced_blob(str(tmp_path), relpath, content_hash, lambda: False)
+    assert os.path.exists(path)
+
+    release_blob(content_hash)
+    assert remove_unreferenced_blob(str(tmp_path), relpath, content_hash, lambda: False)
+    assert not os.path.exists(path)
+
+
+def test_referenced_blob_is_kept(app, tmp_path):
+    content_hash, _, relpath = save_stream(io.BytesIO(b'shared'), str(tmp_path))
+    release_blob(content_hash)
+    assert not remove_unreferenced_blob(str(tmp_path), relpath, content_hash, lambda: True)
+    assert os.path.exists(resolve_path(str(tmp_path), relpath))
+
+
+def test_delete_keeps_blob_shared_with_another_document(student_client):
+    ids = []
+    for name in ('a.png', 'b.png'):
+        response = student_client.post('/api/upload', data={'document': (io.BytesIO(b'identical bytes'), name)},
+                                       content_type='multipart/form-data')
+        assert response.status_code == 202
+        ids.append(response.get_json()['data']['document']['id'])
+        relpath = response.get_json()['data']['document']['filepath']
+    path = resolve_path(Config.UPLOAD_FOLDER, relpath)
+
+    assert student_client.delete(f'/api/document/{ids[0]}').status_code == 200
+    assert os.path.exists(path)
+    assert student_client.delete(f'/api/document/{ids[1]}').status_code == 200
+    assert not os.path.exists(path)
+
+
+def test_failed_batch_upload_removes_saved_blobs(student_client, monkeypatch):
+    import hashlib
+    from routes import student_routes
+    from utils import storage
+
+    def save_stream(stream, upload_dir):
+        data = stream.read()
+        if data == b'broken':
+            raise OSError('disk full')
+        return storage.save_stream(io.BytesIO(data), upload_dir)
+    monkeypatch.setattr(student_routes, 'save_stream', save_stream)
+
+    response = student_client.post('/api/upload/batch', data={'documents': [
+        (io.BytesIO(b'saved before the failure'), 'a.png'),
+        (io.BytesIO(b'broken'), 'b.png'),
+    ]}, content_type='multipart/form-data')
+    assert response.status_code == 500
+
+    content_hash = hashlib.sha256(b'saved before the failure').hexdigest()
+    assert content_hash not in storage._reservations
+    assert not os.path.exists(resolve_path(Config.UPLOAD_FOLDER, storage.blob_relpath(content_hash)))
@@ -0,0 +1,58 @@
+"""
+/uploads/<path> serves a stored file only to its owner or an admin.
+"""
+import io
+import os
+
+
+def _upload(client, data):
+    response = client.post('/api/upload', data={'document': (io.BytesIO(data), 'scan.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    return response.get_json()['data']['document']['filepath']
+
+
+def test_uploads_route_requires_owner(app, student_client, admin_client):
+    relpath = _upload(student_client, b'private scan bytes')
+
+    assert app.test_client().get(f'/uploads/{relpath}').status_code == 401
+
+    other = app.test_client()
+    assert other.post('/api/signup', json={'name': 'Other', 'email': 'other-owner@example.com',
+                                           'password': 'secret'}).status_code == 201
+    assert other.get(f'/uploads/{relpath}').status_code == 404
+
+    response = student_client.get(f'/uploads/{relpath}')
+    assert response.status_code == 200
+    assert response.data == b'private scan bytes'
+    assert 'private' in response.headers['Cache-Control']
+    assert admin_client.get(f'/uploads/{relpath}').status_code == 200
+
+
+def test_uploads_route_hides_temp_files(student_client):
+    assert student_client.get('/uploads/tmp/anything').status_code == 404
+
+
+def test_legacy_path_is_matched_exactly(app, app_ctx):
+    # Pre-content-addressing rows store '{user_id}_{filename}': user 17001's
+    # '17001_cv.pdf' ends with user 7001's '7001_cv.pdf'
+    from config import Config
+    from models import db, User, Document
+    owner, other = (User(name=f'Legacy {i}', email=f'legacy{i}@example.com', password='secret', role='student')
+                    for i in (7001, 17001))
+    owner.id, other.id = 7001, 17001
+    db.session.add_all([owner, other])
+    db.session.flush()
+    for user in (owner, other):
+        name = f'{user.id}_cv.pdf'
+        with open(os.path.join(Config.UPLOAD_FOLDER, name), 'wb') as f:
+            f.write(f'cv of {user.id}'.encode())
+        db.session.add(Document(user_id=user.id, filename='cv.pdf', filepath=name, status='done'))
+    db.session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = other.id
+        sess['user_role'] = 'student'
+    assert client.get('/uploads/7001_cv.pdf').status_code == 404
+    assert client.get('/uploads/17001_cv.pdf').data == b'cv of 17001'
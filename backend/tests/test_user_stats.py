@@ -0,0 +1,61 @@
+"""
+The user_stats rollup must track status changes made across separate commits.
+"""
+from models import db, Document, UserStats
+
+
+def _stats(user_id):
+    db.session.expire_all()
+    return db.session.get(UserStats, user_id)
+
+
+def _add_document(user, status='uploaded'):
+    document = Document(user_id=user.id, filename='cv.pdf', filepath='aa/cv', status=status)
+    db.session.add(document)
+    db.session.commit()
+    return document
+
+
+def _set_status(document, status):
+    # Each step commits, which expires ``status`` before the next assignment
+    document.status = status
+    db.session.commit()
+
+
+def test_processing_to_done(make_user):
+    user = make_user()
+    document = _add_document(user)
+    assert (_stats(user.id).files_total, _stats(user.id).processing) == (1, 0)
+
+    _set_status(document, 'processing')
+    assert _stats(user.id).processing == 1
+
+    _set_status(document, 'done')
+    stats = _stats(user.id)
+    assert (stats.files_total, stats.processing, stats.failed) == (1, 0, 0)
+
+
+def test_processing_to_failed_and_retry(make_user):
+    user = make_user()
+    document = _add_document(user)
+
+    _set_status(document, 'processing')
+    _set_status(document, 'failed')
+    stats = _stats(user.id)
+    assert (stats.processing, stats.failed) == (0, 1)
+
+    _set_status(document, 'processing')
+    _set_status(document, 'done')
+    stats = _stats(user.id)
+    assert (stats.processing, stats.failed) == (0, 0)
+
+
+def test_delete_after_status_change(make_user):
+    user = make_user()
+    document = _add_document(user)
+    _set_status(document, 'processing')
+
+    db.session.delete(document)
+    db.session.commit()
+    stats = _stats(user.id)
+    assert (stats.files_total, stats.processing, stats.failed) == (0, 0, 0)
@@ -0,0 +1,87 @@
+"""
+Write-behind ``users.last_active`` tracking.
+
+Authenticated requests only record a timestamp in memory; a background
+thread writes everything touched during the last window in one bulk
+``UPDATE`` (so each user is written at most once per window) and the
+remainder is flushed on shutdown. Reads no longer turn into writes that
+contend on user rows.
+"""
+import atexit
+import threading
+import traceback
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import update, case
+
+from models import db, User
+
+_users = User.__table__
+
+
+class ActivityTracker:
+    def __init__(self, app=None, interval: float = 60.0):
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._app = app
+        self.interval = float(app.config.get('LAST_ACTIVE_FLUSH_SECONDS', self.interval))
+        app.extensions['activity_tracker'] = self
+        self._thread = threading.Thread(target=self._loop, name='last-active-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def touch(self, user_id: int, when: datetime | None = None):
+        """Record activity for ``user_id``; written on the next flush."""
+        with self._lock:
+            self._pending[user_id] = when or datetime.utcnow()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write all pending touches in one UPDATE; returns the number of users written."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            with self._app.app_context():
+                db.session.execute(
+                    update(_users)
+                    .where(_users.c.id.in_(list(batch)))
+                    .values(last_active=case(batch, value=_users.c.id))
+                )
+                db.session.commit()
+        except Exception as e:
+            print(f"Warning: could not flush last_active for {len(batch)} users: {str(e)}")
+            print(traceback.format_exc())
+            with self._lock:
+                # Keep newer touches that arrived meanwhile, retry the rest next time
+                for uid, ts in batch.items():
+                    self._pending.setdefault(uid, ts)
+            return 0
+        return len(batch)
+
+    def shutdown(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self.flush()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+def get_activity_tracker() -> ActivityTracker:
+    return current_app.extensions['activity_tracker']
@@ -0,0 +1,175 @@
+"""
+Resumable chunked uploads.
+
+A session is a temp file plus a small JSON sidecar under ``UPLOAD_FOLDER/tmp``.
+Chunks are appended in order straight from the request stream, so large
+scans never pass through form parsing or sit in memory, and a client whose
+connection drops asks for the acknowledged offset and continues from there.
+The running SHA-256 is kept in memory together with the offset it covers;
+if another process took some chunks, or this one restarted, it is
+recomputed from the temp file on finalize.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+
+from utils.storage import TMP_DIR, CHUNK_SIZE, commit_blob
+
+SESSION_TTL = 24 * 3600
+
+_hashers = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+class ChunkError(Exception):
+    """Raised for chunks that do not fit the session (bad index, too large...)."""
+
+
+def _paths(upload_dir: str, upload_id: str):
+    base = os.path.join(upload_dir, TMP_DIR, f'chunked-{upload_id}')
+    return base + '.part', base + '.json'
+
+
+def _lock_for(upload_id: str) -> threading.Lock:
+    with _registry_lock:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+
+def _write_meta(meta_path: str, meta: dict):
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+
+def create_session(upload_dir: str, user_id: int, filename: str, total_size: int | None, chunk_size: int) -> dict:
+    purge_stale_sessions(upload_dir)
+    os.makedirs(os.path.join(upload_dir, TMP_DIR), exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    part_path, meta_path = _paths(upload_dir, upload_id)
+    open(part_path, 'wb').close()
+    meta = {
+        'upload_id': upload_id,
+        'user_id': user_id,
+        'filename': filename,
+        'total_size': total_size,
+        'chunk_size': chunk_size,
+        'offset': 0,
+        'created_at': time.time(),
+    }
+    _write_meta(meta_path, meta)
+    with _registry_lock:
+        _hashers[upload_id] = (0, hashlib.sha256())
+    return meta
+
+
+def get_session(upload_dir: str, upload_id: str) -> dict | None:
+    if not upload_id.isalnum():
+        return None
+    _, meta_path = _paths(upload_dir, upload_id)
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def append_chunk(upload_dir: str, meta: dict, index: int, stream, max_bytes: int) -> dict:
+    """Append chunk ``index`` from ``stream``; returns the updated session.
+
+    Re-sending an already acknowledged chunk is a no-op, so clients can retry
+    blindly after a dropped connection.
+    """
+    upload_id = meta['upload_id']
+    with _lock_for(upload_id):
+        meta = get_session(upload_dir, upload_id) or meta
+        chunk_size = meta['chunk_size']
+        start = index * chunk_size
+        if start < meta['offset']:
+            return meta
+        if start != meta['offset']:
+            raise ChunkError(f"Expected chunk {meta['offset'] // chunk_size}, got {index}")
+
+        part_path, meta_path = _paths(upload_dir, upload_id)
+        with _registry_lock:
+            entry = _hashers.get(upload_id)
+        # Hash into a copy so a rejected chunk leaves the running digest intact
+        running = entry[1].copy() if entry is not None and entry[0] == start else None
+        written = 0
+        with open(part_path, 'r+b') as out:
+            out.seek(start)
+            while True:
+                data = stream.read(CHUNK_SIZE)
+                if not data:
+                    break
+                written += len(data)
+                if written > chunk_size or start + written > max_bytes:
+                    out.truncate(start)
+                    raise ChunkError('Chunk exceeds the session chunk size or upload limit')
+                out.write(data)
+                if running is not None:
+                    running.update(data)
+            out.truncate(start + written)
+        if written < chunk_size and meta['total_size'] and start + written < meta['total_size']:
+            # Only the final chunk may be short; anything else would shift later offsets
+            with open(part_path, 'r+b') as out:
+                out.truncate(start)
+            raise ChunkError('Short chunk before the end of the file')
+        meta['offset'] = start + written
+        _write_meta(meta_path, meta)
+        with _registry_lock:
+            if running is not None:
+                _hashers[upload_id] = (meta['offset'], running)
+            else:
+                _hashers.pop(upload_id, None)
+        return meta
+
+
+def finalize_session(upload_dir: str, meta: dict):
+    """Move the assembled file into the blob store; returns ``(content_hash, size, relpath)``."""
+    upload_id = meta['upload_id']
+    with _lock_for(upload_id):
+        part_path, meta_path = _paths(upload_dir, upload_id)
+        size = os.path.getsize(part_path)
+        if meta['total_size'] is not None and size != meta['total_size']:
+            raise ChunkError(f"Upload incomplete: {size} of {meta['total_size']} bytes received")
+        with _registry_lock:
+            entry = _hashers.pop(upload_id, None)
+        hasher = entry[1] if entry is not None and entry[0] == size else None
+        if hasher is None:
+            hasher = hashlib.sha256()
+            with open(part_path, 'rb') as f:
+                for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    hasher.update(data)
+        content_hash = hasher.hexdigest()
+        relpath = commit_blob(part_path, content_hash, upload_dir)
+        os.remove(meta_path)
+    with _registry_lock:
+        _locks.pop(upload_id, None)
+    return content_hash, size, relpath
+
+
+def abort_session(upload_dir: str, upload_id: str):
+    with _registry_lock:
+        _hashers.pop(upload_id, None)
+        _locks.pop(upload_id, None)
+    for path in _paths(upload_dir, upload_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def purge_stale_sessions(upload_dir: str, ttl: int = SESSION_TTL):
+    """Remove sessions that have not been finalized within ``ttl`` seconds."""
+    tmp_dir = os.path.join(upload_dir, TMP_DIR)
+    if not os.path.isdir(tmp_dir):
+        return
+    cutoff = time.time() - ttl
+    for name in os.listdir(tmp_dir):
+        if name.startswith('chunked-') and name.endswith('.json'):
+            path = os.path.join(tmp_dir, name)
+            if os.path.getmtime(path) < cutoff:
+                abort_session(upload_dir, name[len('chunked-'):-len('.json')])
@@ -0,0 +1,106 @@
+"""
+Connection pool metrics.
+
+Pool events track connections created, checked out, invalidated and created
+beyond ``pool_size`` (overflow), and ``pool.connect`` is timed so we can see
+how long requests wait for a connection. Exposed at GET /api/admin/db/pool
+so pools can be sized per deployment and exhaustion spotted during upload
+bursts.
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+
+class PoolMetrics:
+    def __init__(self, app=None, db=None):
+        self._lock = threading.Lock()
+        self._engine = None
+        self.reset()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.extensions['db_pool_metrics'] = self
+        with app.app_context():
+            self.attach(db.engine)
+
+    def reset(self):
+        with self._lock:
+            self._counters = {
+                'connects': 0,
+                'checkouts': 0,
+                'checkins': 0,
+                'overflow_events': 0,
+                'invalidations': 0,
+                'soft_invalidations': 0,
+                'timeouts': 0,
+                'wait_seconds_total': 0.0,
+                'wait_seconds_max': 0.0,
+            }
+
+    def _inc(self, key: str, n=1):
+        with self._lock:
+            self._counters[key] += n
+
+    def attach(self, engine):
+        """Register pool listeners and time checkouts on ``engine`` (idempotent)."""
+        if self._engine is engine:
+            return
+        self._engine = engine
+        pool = engine.pool
+        event.listen(pool, 'connect', self._on_connect)
+        event.listen(pool, 'checkout', lambda *a: self._inc('checkouts'))
+        event.listen(pool, 'checkin', lambda *a: self._inc('checkins'))
+        event.listen(pool, 'invalidate', lambda *a: self._inc('invalidations'))
+        event.listen(pool, 'soft_invalidate', lambda *a: self._inc('soft_invalidations'))
+        # dispose() swaps in a recreated pool (listeners are copied, the timer is not)
+        event.listen(engine, 'engine_disposed', lambda *a: self._wrap_connect(engine.pool))
+        self._wrap_connect(pool)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self._inc('connects')
+        overflow = getattr(self._engine.pool, 'overflow', None)
+        if overflow is not None and overflow() > 0:
+            self._inc('overflow_events')
+
+    def _wrap_connect(self, pool):
+        if getattr(pool.connect, '_timed', False):
+            return
+        connect = pool.connect
+
+        def timed_connect():
+            start = time.perf_counter()
+            try:
+                return connect()
+            except PoolTimeoutError:
+                self._inc('timeouts')
+                raise
+            finally:
+                waited = time.perf_counter() - start
+                with self._lock:
+                    self._counters['wait_seconds_total'] += waited
+                    if waited > self._counters['wait_seconds_max']:
+                        self._counters['wait_seconds_max'] = waited
+
+        timed_connect._timed = True
+        pool.connect = timed_connect
+
+    def snapshot(self) -> dict:
+        pool = self._engine.pool if self._engine is not None else None
+        with self._lock:
+            data = dict(self._counters)
+        data['wait_seconds_avg'] = data['wait_seconds_total'] / data['checkouts'] if data['checkouts'] else 0.0
+        data['pool_class'] = type(pool).__name__ if pool is not None else None
+        for key, name in (('pool_size', 'size'), ('checked_out', 'checkedout'),
+                          ('checked_in', 'checkedin'), ('overflow', 'overflow')):
+            fn = getattr(pool, name, None)
+            data[key] = fn() if callable(fn) else None
+        return data
+
+
+def get_pool_metrics() -> PoolMetrics:
+    return current_app.extensions['db_pool_metrics']
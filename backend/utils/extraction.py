@@ -0,0 +1,258 @@
+"""
+Parallel text extraction engine for uploaded documents.
+
+PDFs are split into page ranges that run on a bounded process pool, so large
+transcripts use every core instead of one thread under the GIL. Pages without
+a text layer fall back to OCR of their embedded images. Results are put back
+together in page order; each document gets a deadline and a page cap so a
+single bad file cannot hold the pool.
+"""
+import os
+import io
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, ALL_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from PyPDF2 import PdfReader
+except Exception:
+    PdfReader = None
+
+try:
+    import pytesseract
+    from PIL import Image
+except Exception:
+    pytesseract = None
+    Image = None
+
+from utils.metrics import EXTRACTION_SECONDS, EXTRACTION_PAGES
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Bump whenever a change here alters extracted output; cached results keyed on
+# an older version are ignored and purged (see utils/extraction_cache.py).
+EXTRACTOR_VERSION = 1
+
+
+class ExtractionError(Exception):
+    """The document could not be extracted (unreadable file, missing libraries, no page succeeded)."""
+
+
+def _ocr(img, ocr: dict) -> str:
+    return (pytesseract.image_to_string(img, lang=ocr.get('lang') or None, config=ocr.get('config') or '') or '').strip()
+
+
+def _extract_pdf_range(filepath: str, start: int, stop: int, ocr_fallback: bool, ocr: dict) -> list:
+    """Worker: extract pages ``[start, stop)`` and return ``(index, text, method, seconds)`` tuples."""
+    results = []
+    with open(filepath, 'rb') as f:
+        reader = PdfReader(f)
+        for i in range(start, stop):
+            started = time.perf_counter()
+            method = 'text'
+            try:
+                page = reader.pages[i]
+                page_text = (page.extract_text() or '').strip()
+                if not page_text and ocr_fallback and pytesseract is not None and Image is not None:
+                    # Scanned page: OCR whatever images are embedded in it
+                    method = 'ocr'
+                    ocr_parts = []
+                    for image_file in page.images:
+                        ocr_parts.append(_ocr(Image.open(io.BytesIO(image_file.data)), ocr))
+                    page_text = '\n'.join(p for p in ocr_parts if p).strip()
+            except Exception as e:
+                print(f"Error extracting text from page {i + 1}: {str(e)}")
+                method = 'error'
+                page_text = ''
+            results.append((i, page_text, method, time.perf_counter() - started))
+    return results
+
+
+def _extract_image(filepath: str, ocr: dict) -> list:
+    """Worker: OCR a single image file."""
+    started = time.perf_counter()
+    try:
+        text = _ocr(Image.open(filepath), ocr)
+    except Exception as e:
+        # Some pytesseract errors (e.g. TesseractNotFoundError) cannot be
+        # unpickled in the parent, which would mark the shared pool broken
+        raise RuntimeError(f'OCR failed: {e}') from None
+    return [(0, text, 'ocr', time.perf_counter() - started)]
+
+
+def _record_timings(pages: list):
+    """Report worker time and page counts per method (``text`` layer vs ``ocr``)."""
+    seconds, counts = {}, {}
+    for _, _, method, took in pages:
+        seconds[method] = seconds.get(method, 0.0) + took
+        counts[method] = counts.get(method, 0) + 1
+    for method, took in seconds.items():
+        EXTRACTION_SECONDS.observe(took, method)
+        EXTRACTION_PAGES.inc(method, amount=counts[method])
+
+
+class ExtractionEngine:
+    """Splits documents into page tasks and runs them on a shared process pool."""
+
+    def __init__(self, max_workers: int | None = None, pages_per_task: int = 4,
+                 timeout: float = 120, max_pages: int = 500, ocr_fallback: bool = True,
+                 ocr_lang: str = 'eng', ocr_config: str = ''):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, int(pages_per_task))
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.ocr_fallback = ocr_fallback
+        self.ocr = {'lang': ocr_lang, 'config': ocr_config}
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def settings(self) -> dict:
+        """Everything besides the file bytes that affects the extracted output."""
+        return {
+            'version': EXTRACTOR_VERSION,
+            'max_pages': self.max_pages,
+            'ocr_fallback': self.ocr_fallback,
+            'ocr_lang': self.ocr['lang'],
+            'ocr_config': self.ocr['config'],
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn keeps DB connections and worker threads out of the children
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._pool
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor):
+        """Throw away a pool whose workers are stuck or dead."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        processes = list((getattr(pool, '_processes', None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for p in processes:
+            try:
+                p.terminate()
+            except Exception:
+                pass
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _plan(self, filepath: str, ext: str):
+        """Return ``(tasks, total_pages)`` where tasks are ``(fn, args)`` tuples."""
+        if ext == '.pdf':
+            if PdfReader is None:
+                raise ExtractionError('PyPDF2 not available, cannot extract text from PDF')
+            try:
+                with open(filepath, 'rb') as f:
+                    total = len(PdfReader(f).pages)
+            except Exception as e:
+                raise ExtractionError(f'unreadable PDF: {e}') from e
+            limit = min(total, self.max_pages) if self.max_pages else total
+            tasks = [
+                (_extract_pdf_range, (filepath, start, min(start + self.pages_per_task, limit), self.ocr_fallback, self.ocr))
+                for start in range(0, limit, self.pages_per_task)
+            ]
+            return tasks, total
+        if ext in IMAGE_EXTENSIONS:
+            if pytesseract is None or Image is None:
+                raise ExtractionError('pytesseract or PIL not available, cannot extract text from image')
+            return [(_extract_image, (filepath, self.ocr))], 1
+        raise ExtractionError(f'unsupported file extension: {ext}')
+
+    def extract(self, filepath: str, ext: str | None = None) -> dict:
+        """Extract text from ``filepath``.
+
+        Returns a dict with ``text``, per-page metadata in ``pages``, the
+        document's ``total_pages``, ``truncated``/``timed_out`` flags, the
+        number of ``failed_tasks`` and ``complete``, which is true only when
+        every planned page was extracted without error. Raises
+        ``ExtractionError`` if the file cannot be read or no page succeeded.
+        """
+        ext = (ext or os.path.splitext(filepath)[1]).lower()
+        tasks, total_pages = self._plan(filepath, ext)
+        result = {'text': '', 'pages': [], 'total_pages': total_pages,
+                  'truncated': bool(self.max_pages) and total_pages > self.max_pages,
+                  'timed_out': False, 'failed_tasks': 0, 'complete': True}
+        if not tasks:
+            return result
+        if result['truncated']:
+            print(f"Warning: {filepath} has {total_pages} pages, extracting first {self.max_pages}")
+
+        deadline = time.monotonic() + self.timeout
+        pages, errors = [], []
+        # A pool broken by another document's crash or timeout fails our tasks
+        # too; give those one more run on a fresh pool.
+        for attempt in range(2):
+            pool = self._get_pool()
+            futures = {pool.submit(fn, *args): (fn, args) for fn, args in tasks}
+            done, pending = wait(futures, timeout=max(deadline - time.monotonic(), 0), return_when=ALL_COMPLETED)
+            if pending:
+                result['timed_out'] = True
+                print(f"Warning: extraction of {filepath} exceeded {self.timeout}s, keeping completed pages")
+                for f in pending:
+                    f.cancel()
+                # Only a task still running holds a worker; queued ones were just cancelled
+                if any(f.running() for f in pending):
+                    self._recycle_pool(pool)
+                errors.extend(TimeoutError(f'page task exceeded {self.timeout}s') for _ in pending)
+
+            broken = []
+            for f in done:
+                try:
+                    pages.extend(f.result())
+                except BrokenProcessPool as e:
+                    broken.append((f, e))
+                except Exception as e:
+                    print(f"Extraction task failed for {filepath}: {str(e)}")
+                    errors.append(e)
+            if broken:
+                self._recycle_pool(pool)
+            if not broken or attempt or time.monotonic() >= deadline:
+                errors.extend(e for _, e in broken)
+                break
+            print(f"Warning: extraction pool broke while extracting {filepath}, retrying {len(broken)} task(s)")
+            tasks = [futures[f] for f, _ in broken]
+
+        pages.sort(key=lambda p: p[0])
+        page_errors = sum(1 for _, _, method, _ in pages if method == 'error')
+        result['failed_tasks'] = len(errors)
+        result['complete'] = not errors and not page_errors
+        result['pages'] = [{'page': i + 1, 'chars': len(t), 'method': m} for i, t, m, _ in pages]
+        result['text'] = '\n'.join(t for _, t, _, _ in pages if t).strip()
+        _record_timings(pages)
+        print(f"Total extracted text length: {len(result['text'])} characters from {len(pages)} page(s)")
+        if not any(m != 'error' for _, _, m, _ in pages):
+            reason = errors[0] if errors else 'every page failed'
+            raise ExtractionError(f'no page of {filepath} could be extracted: {reason}')
+        return result
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(config=None) -> ExtractionEngine:
+    """Return the process-wide engine, creating it from ``config`` on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            config = config or {}
+            _engine = ExtractionEngine(
+                max_workers=config.get('EXTRACTION_WORKERS'),
+                pages_per_task=config.get('EXTRACTION_PAGES_PER_TASK', 4),
+                timeout=config.get('EXTRACTION_TIMEOUT', 120),
+                max_pages=config.get('EXTRACTION_MAX_PAGES', 500),
+                ocr_fallback=config.get('EXTRACTION_OCR_FALLBACK', True),
+                ocr_lang=config.get('OCR_LANG', 'eng'),
+                ocr_config=config.get('OCR_CONFIG', ''),
+            )
+        return _engine
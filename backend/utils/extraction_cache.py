@@ -0,0 +1,125 @@
+"""
+Persistent cache of extraction results.
+
+Entries are keyed by the SHA-256 of the file bytes plus the engine settings
+(extractor version, page cap, OCR language/config), so a repeated extraction
+of the same bytes is a single primary-key lookup. Bumping
+``EXTRACTOR_VERSION`` makes old entries unreachable; they are purged on the
+next eviction pass along with least-recently-used rows once the table grows
+past its byte budget.
+"""
+import json
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ExtractionCacheEntry
+from utils.metrics import EXTRACTION_CACHE
+from utils.extraction import EXTRACTOR_VERSION
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file on disk (used for legacy rows without ``content_hash``)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash: str, settings: dict) -> str:
+    payload = json.dumps({'hash': content_hash, 'settings': settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def lookup(content_hash: str, settings: dict) -> dict | None:
+    """Return a cached result dict (``text``, ``pages``) or None."""
+    entry = db.session.get(ExtractionCacheEntry, cache_key(content_hash, settings))
+    if entry is None:
+        return None
+    entry.last_used_at = datetime.utcnow()
+    db.session.commit()
+    return {'text': entry.extracted_text or '', 'pages': entry.pages or [], 'complete': True, 'cached': True}
+
+
+def store(content_hash: str, settings: dict, result: dict):
+    """Insert or replace the cached result for ``content_hash``."""
+    key = cache_key(content_hash, settings)
+    text_value = result.get('text') or ''
+    try:
+        entry = db.session.get(ExtractionCacheEntry, key)
+        if entry is None:
+            entry = ExtractionCacheEntry(cache_key=key, content_hash=content_hash)
+            db.session.add(entry)
+        entry.extractor_version = settings.get('version', EXTRACTOR_VERSION)
+        entry.extracted_text = text_value
+        entry.pages = result.get('pages') or []
+        entry.size_bytes = len(text_value.encode('utf-8'))
+        entry.last_used_at = datetime.utcnow()
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored the same key first; its result is equivalent
+        db.session.rollback()
+
+
+def evict(max_bytes: int):
+    """Drop entries from older extractor versions, then LRU entries over ``max_bytes``."""
+    ExtractionCacheEntry.query.filter(
+        ExtractionCacheEntry.extractor_version != EXTRACTOR_VERSION
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+    total = db.session.query(func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0)).scalar() or 0
+    if total <= max_bytes:
+        return
+    victims = []
+    rows = db.session.query(ExtractionCacheEntry.cache_key, ExtractionCacheEntry.size_bytes) \
+        .order_by(ExtractionCacheEntry.last_used_at.asc()).yield_per(500)
+    for key, size in rows:
+        if total <= max_bytes:
+            break
+        victims.append(key)
+        total -= size or 0
+    for i in range(0, len(victims), 500):
+        ExtractionCacheEntry.query.filter(
+            ExtractionCacheEntry.cache_key.in_(victims[i:i + 500])
+        ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def cached_extract(engine, filepath: str, ext: str | None = None, content_hash: str | None = None,
+                   max_bytes: int = 0, use_cache: bool = True) -> dict:
+    """Run ``engine.extract`` through the cache.
+
+    With ``use_cache=False`` the lookup is skipped but the fresh result still
+    replaces the cached one. Only complete results are cached: a run cut
+    short by the deadline or with a failed page task would otherwise serve
+    truncated text for these bytes forever. ``ExtractionError`` from the
+    engine propagates.
+    """
+    content_hash = content_hash or file_sha256(filepath)
+    settings = engine.settings()
+    if use_cache:
+        try:
+            hit = lookup(content_hash, settings)
+            if hit is not None:
+                print(f"Extraction cache hit for {content_hash[:12]}")
+                EXTRACTION_CACHE.inc('hit')
+                return hit
+            EXTRACTION_CACHE.inc('miss')
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: extraction cache lookup failed: {str(e)}")
+
+    result = engine.extract(filepath, ext)
+    if result.get('pages') and result.get('complete'):
+        try:
+            store(content_hash, settings, result)
+            if max_bytes:
+                evict(max_bytes)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: extraction cache store failed: {str(e)}")
+    return result
@@ -0,0 +1,97 @@
+"""
+Local background job queue with a fixed pool of worker threads.
+
+Jobs run inside the Flask application context so they can use ``db.session``
+and ``Config`` exactly like a request handler would.
+"""
+import atexit
+import queue
+import threading
+import traceback
+
+from flask import current_app
+
+
+class JobQueue:
+    """In-process FIFO queue drained by a pool of daemon worker threads."""
+
+    def __init__(self, app=None, workers: int = 2):
+        self._queue = queue.Queue()
+        self._threads = []
+        self._workers = workers
+        self._app = None
+        self._stopped = False
+        self._active = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind the queue to ``app`` and start the worker threads."""
+        self._app = app
+        self._workers = app.config.get('JOB_QUEUE_WORKERS', self._workers)
+        app.extensions['job_queue'] = self
+        for i in range(max(1, int(self._workers))):
+            t = threading.Thread(target=self._run, name=f'job-worker-{i + 1}', daemon=True)
+            t.start()
+            self._threads.append(t)
+        atexit.register(self.shutdown)
+
+    def enqueue(self, name: str, func, *args, **kwargs):
+        """Schedule ``func(*args, **kwargs)`` to run on a worker thread."""
+        if self._stopped:
+            raise RuntimeError('Job queue is shut down')
+        self._queue.put((name, func, args, kwargs))
+
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def active(self) -> int:
+        """Number of jobs currently running."""
+        return self._active
+
+    def join(self):
+        """Block until every queued job has finished (useful for scripts)."""
+        self._queue.join()
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and let workers exit once the queue is drained."""
+        if self._stopped:
+            return
+        self._stopped = True
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for t in self._threads:
+                t.join(timeout=30)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            name, func, args, kwargs = item
+            with self._lock:
+                self._active += 1
+            try:
+                with self._app.app_context():
+                    func(*args, **kwargs)
+            except Exception as e:
+                print(f"Job {name} failed: {str(e)}")
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._active -= 1
+                self._queue.task_done()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the job queue bound to the current app."""
+    return current_app.extensions['job_queue']
+
+
+def enqueue(name: str, func, *args, **kwargs):
+    """Schedule a job on the current app's queue."""
+    get_job_queue().enqueue(name, func, *args, **kwargs)
@@ -0,0 +1,335 @@
+"""
+LLM provider layer.
+
+Profile generation used to build a fresh ``genai.GenerativeModel`` on every
+call with no timeout, retry or concurrency limit, so one slow provider
+response held a request worker for as long as it took. ``LLMClient`` wraps a
+provider with:
+
+- a per-process semaphore bounding in-flight calls (callers wait at most
+  ``LLM_QUEUE_TIMEOUT`` for a slot),
+- a per-attempt timeout and an overall deadline across retries,
+- retries with full-jitter exponential backoff for transient errors
+  (timeouts, rate limits, 5xx),
+- a circuit breaker that fails fast for ``LLM_CIRCUIT_RESET_SECONDS`` after
+  ``LLM_CIRCUIT_FAILURES`` consecutive transient failures, then lets a single
+  probe call through.
+
+``LLMClient.stream`` yields the reply as it is generated, under the same
+limits. Providers: ``gemini`` (default) and ``stub``, a deterministic in-process
+provider for load testing and air-gapped environments.
+"""
+import json
+import time
+import random
+import hashlib
+import threading
+
+from flask import current_app
+
+# Exception class names (google.api_core and friends) worth retrying
+TRANSIENT_ERRORS = {
+    'DeadlineExceeded', 'ServiceUnavailable', 'ResourceExhausted', 'TooManyRequests',
+    'InternalServerError', 'GatewayTimeout', 'BadGateway', 'Aborted',
+}
+
+
+class LLMError(Exception):
+    """The provider call failed."""
+
+
+class LLMUnavailable(LLMError):
+    """No call was made: the circuit is open or no concurrency slot freed up in time."""
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+class GeminiProvider:
+    """google.generativeai with one model object reused across calls."""
+
+    name = 'gemini'
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            import google.generativeai as genai
+            with self._lock:
+                if self._model is None:
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        response = self._get_model().generate_content(prompt, request_options={'timeout': timeout})
+        text = (getattr(response, 'text', '') or '').strip()
+        if text:
+            return text
+        # Fallback: reconstruct text from candidates/parts if .text is missing
+        parts = []
+        try:
+            for cand in getattr(response, 'candidates', []) or []:
+                for part in getattr(cand, 'content', {}).get('parts', []):
+                    if isinstance(part, dict) and 'text' in part:
+                        parts.append(part['text'])
+        except Exception:
+            pass
+        return '\n'.join(parts).strip()
+
+    def stream(self, prompt: str, timeout: float):
+        response = self._get_model().generate_content(prompt, stream=True, request_options={'timeout': timeout})
+        for chunk in response:
+            try:
+                yield chunk.text
+            except ValueError:
+                # Chunk without text parts (e.g. only finish/safety metadata)
+                continue
+
+
+class StubProvider:
+    """Deterministic local provider: no network, configurable latency.
+
+    Returns a profile-shaped JSON reply derived from the prompt, so callers
+    exercise the same parsing and persistence paths as with a real model.
+    """
+
+    name = 'stub'
+    SKILLS = ('Python', 'Java', 'SQL', 'JavaScript', 'React', 'Flask', 'Docker', 'AWS',
+              'Machine Learning', 'Data Analysis', 'Excel', 'C++')
+
+    def __init__(self, model_name: str = 'stub', latency: float = 0.0):
+        self.model_name = model_name
+        self.latency = latency
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        if self.latency:
+            if self.latency > timeout:
+                time.sleep(timeout)
+                raise TimeoutError(f'stub provider timed out after {timeout:.1f}s')
+            time.sleep(self.latency)
+        return self._reply(prompt)
+
+    def stream(self, prompt: str, timeout: float, pieces: int = 20):
+        reply = self._reply(prompt)
+        step = -(-len(reply) // pieces)
+        for i in range(0, len(reply), step):
+            if self.latency:
+                time.sleep(min(self.latency, timeout) / pieces)
+            yield reply[i:i + step]
+
+    def _reply(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        lowered = prompt.lower()
+        profile = {
+            'name': '',
+            'email': '',
+            'education': '',
+            'skills': [s for s in self.SKILLS if s.lower() in lowered],
+            'certifications': [],
+            'achievements': [],
+            'summary': f'Profile generated locally ({digest[:12]}).',
+        }
+        return '```json\n' + json.dumps(profile) + '\n```'
+
+
+PROVIDERS = {
+    'gemini': lambda model_name, config: GeminiProvider(model_name),
+    'stub': lambda model_name, config: StubProvider('stub', float(config.get('LLM_STUB_LATENCY', 0))),
+}
+
+
+class CircuitBreaker:
+    """Closed -> open after ``threshold`` consecutive failures -> half-open after ``reset_seconds``."""
+
+    def __init__(self, threshold: int = 5, reset_seconds: float = 30.0):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            # Half-open: let exactly one call through to test the provider
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                if self._opened_at is None or self._probing:
+                    print(f"LLM circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release_probe(self):
+        """A half-open probe ended without a verdict (e.g. a non-transient error)."""
+        with self._lock:
+            self._probing = False
+
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_seconds:
+                return 'half_open'
+            return 'open'
+
+
+class LLMClient:
+    def __init__(self, app=None):
+        self.provider = None
+        self.max_concurrency = 4
+        self.queue_timeout = 10.0
+        self.timeout = 60.0
+        self.deadline = 90.0
+        self.max_retries = 2
+        self.retry_base = 0.5
+        self.breaker = CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        name = app.config.get('LLM_PROVIDER', 'gemini')
+        if name not in PROVIDERS:
+            raise ValueError(f"Unknown LLM_PROVIDER {name!r}; expected one of {', '.join(sorted(PROVIDERS))}")
+        model_name = app.config.get('GEMINI_MODEL', 'gemini-2.5-flash')
+        self.provider = PROVIDERS[name](model_name, app.config)
+        self.max_concurrency = int(app.config.get('LLM_MAX_CONCURRENCY', self.max_concurrency))
+        self.queue_timeout = float(app.config.get('LLM_QUEUE_TIMEOUT', self.queue_timeout))
+        self.timeout = float(app.config.get('LLM_TIMEOUT', self.timeout))
+        self.deadline = float(app.config.get('LLM_DEADLINE', self.deadline))
+        self.max_retries = int(app.config.get('LLM_MAX_RETRIES', self.max_retries))
+        self.retry_base = float(app.config.get('LLM_RETRY_BASE_SECONDS', self.retry_base))
+        self.breaker = CircuitBreaker(int(app.config.get('LLM_CIRCUIT_FAILURES', 5)),
+                                      float(app.config.get('LLM_CIRCUIT_RESET_SECONDS', 30)))
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        app.extensions['llm_client'] = self
+
+    @property
+    def model_name(self) -> str:
+        return self.provider.model_name
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def generate(self, prompt: str) -> str:
+        """Return the provider's text reply for ``prompt``.
+
+        Raises ``LLMUnavailable`` when failing fast and ``LLMError`` when every
+        attempt failed or the deadline ran out.
+        """
+        started = time.monotonic()
+        self._acquire()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    text = self.provider.generate(prompt, timeout=self._attempt_timeout(started))
+                except Exception as e:
+                    self._backoff_or_raise(e, attempt, started)
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                return text
+        finally:
+            self._release()
+
+    def stream(self, prompt: str):
+        """Yield the provider's reply for ``prompt`` in pieces as it is generated.
+
+        Transient failures before the first piece are retried as in
+        ``generate``; once text has been yielded a failure raises ``LLMError``.
+        The concurrency slot is held until the generator is exhausted or closed.
+        """
+        started = time.monotonic()
+        self._acquire()
+        finished = False
+        try:
+            attempt = 0
+            while True:
+                emitted = False
+                try:
+                    for piece in self.provider.stream(prompt, timeout=self._attempt_timeout(started)):
+                        if piece:
+                            emitted = True
+                            yield piece
+                        if time.monotonic() - started > self.deadline:
+                            raise TimeoutError(f'LLM deadline of {self.deadline:.0f}s exceeded')
+                except Exception as e:
+                    if emitted:
+                        if is_transient(e):
+                            self.breaker.record_failure()
+                        finished = True
+                        raise LLMError(f'{self.provider.name} stream failed: {e}') from e
+                    self._backoff_or_raise(e, attempt, started)
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                finished = True
+                return
+        finally:
+            if not finished:
+                # Closed by the consumer (e.g. client disconnected) or failed fast
+                self.breaker.release_probe()
+            self._release()
+
+    def _acquire(self):
+        if not self.breaker.allow():
+            raise LLMUnavailable('LLM provider is unavailable (circuit open)')
+        if not self._slots.acquire(timeout=min(self.queue_timeout, self.deadline)):
+            self.breaker.release_probe()
+            raise LLMUnavailable(f'No LLM slot free within {self.queue_timeout:.0f}s '
+                                 f'({self.max_concurrency} calls in flight)')
+        with self._lock:
+            self._in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _attempt_timeout(self, started: float) -> float:
+        remaining = self.deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            raise TimeoutError(f'LLM deadline of {self.deadline:.0f}s exceeded')
+        return min(self.timeout, remaining)
+
+    def _backoff_or_raise(self, error: Exception, attempt: int, started: float):
+        """Sleep before the next attempt, or raise ``LLMError`` if there is none."""
+        if not is_transient(error):
+            self.breaker.release_probe()
+            raise LLMError(f'{self.provider.name} call failed: {error}') from error
+        self.breaker.record_failure()
+        # Full jitter: sleep uniformly in [0, base * 2^attempt)
+        backoff = random.uniform(0, self.retry_base * (2 ** attempt))
+        remaining = self.deadline - (time.monotonic() - started)
+        if attempt >= self.max_retries or backoff >= remaining or not self.breaker.allow():
+            raise LLMError(f'{self.provider.name} call failed after {attempt + 1} attempt(s): {error}') from error
+        print(f"LLM call failed ({error}); retrying in {backoff:.2f}s")
+        time.sleep(backoff)
+
+
+def get_llm_client() -> LLMClient:
+    return current_app.extensions['llm_client']
@@ -0,0 +1,185 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+A deliberately small registry (no extra dependency): counters and histograms
+keyed by label values, plus gauges read from callbacks at scrape time.
+Recording a sample is a lock, a dict lookup and a bisect, so it is cheap
+enough for every request. Metrics are per process; scrape each worker.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request, g
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _num(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _labels(self.labelnames, k), v) for k, v in items]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][idx] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def samples(self):
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        out = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                out.append((self.name + '_bucket', _labels(self.labelnames, key, f'le="{_num(bound)}"'), cumulative))
+            out.append((self.name + '_sum', _labels(self.labelnames, key), total))
+            out.append((self.name + '_count', _labels(self.labelnames, key), count))
+        return out
+
+
+class CallbackGauge:
+    """Gauge read at scrape time; ``fn`` returns a number or ``{labelvalues: number}``."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, fn, labelnames=()):
+        self.name, self.help, self.fn, self.labelnames = name, help, fn, tuple(labelnames)
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Warning: metrics callback {self.name} failed: {str(e)}")
+            return []
+        if isinstance(value, dict):
+            return [(self.name, _labels(self.labelnames, k if isinstance(k, tuple) else (k,)), v)
+                    for k, v in value.items() if v is not None]
+        return [] if value is None else [(self.name, '', value)]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering (e.g. a second create_app in tests) keeps the first instance
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, fn, labelnames=()) -> CallbackGauge:
+        with self._lock:
+            # Callbacks close over the current app: the latest registration wins
+            self._metrics[name] = CallbackGauge(name, help, fn, labelnames)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines.append(f'# HELP {m.name} {m.help}')
+            lines.append(f'# TYPE {m.name} {m.kind}')
+            for name, labels, value in m.samples():
+                lines.append(f'{name}{labels} {_num(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'doclocker_http_request_duration_seconds', 'Request latency by blueprint and route.',
+    ('blueprint', 'endpoint', 'method'))
+HTTP_REQUESTS = REGISTRY.counter(
+    'doclocker_http_requests_total', 'Requests by blueprint, route and status code.',
+    ('blueprint', 'endpoint', 'method', 'status'))
+UPLOAD_STAGE_SECONDS = REGISTRY.histogram(
+    'doclocker_upload_stage_duration_seconds', 'Time spent in each upload/processing stage.', ('stage',))
+EXTRACTION_SECONDS = REGISTRY.histogram(
+    'doclocker_extraction_duration_seconds', 'Worker time spent extracting text, by method (pdf text layer or OCR).',
+    ('method',))
+EXTRACTION_PAGES = REGISTRY.counter(
+    'doclocker_extraction_pages_total', 'Pages extracted, by method.', ('method',))
+EXTRACTION_CACHE = REGISTRY.counter(
+    'doclocker_extraction_cache_total', 'Extraction cache lookups by result.', ('result',))
+GEMINI_SECONDS = REGISTRY.histogram(
+    'doclocker_gemini_request_duration_seconds', 'LLM profile generation latency by outcome.', ('outcome',))
+GEMINI_REQUESTS = REGISTRY.counter(
+    'doclocker_gemini_requests_total', 'LLM profile generation calls by outcome.', ('outcome',))
+
+
+def init_request_metrics(app):
+    """Time every request and count responses per blueprint/route/status."""
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            labels = (request.blueprint or 'app', request.endpoint or 'unmatched', request.method)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, *labels)
+            HTTP_REQUESTS.inc(*labels, str(response.status_code))
+        return response
@@ -0,0 +1,79 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Instead of ``OFFSET`` (which makes the database walk and discard every
+skipped row) each page continues from the ``(sort value, id)`` of the last
+row of the previous page, so page 500 costs the same as page 1. Rows whose
+sort value is NULL are kept in a trailing segment ordered by id, which keeps
+both segments index-friendly on every backend.
+"""
+import json
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        payload = {'t': 'dt', 'v': value.isoformat()}
+    else:
+        payload = {'t': 'raw', 'v': value}
+    payload['id'] = row_id
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Return ``(value, id)`` from an opaque cursor string."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        value = payload['v']
+        if payload.get('t') == 'dt' and value is not None:
+            value = datetime.fromisoformat(value)
+        return value, int(payload['id'])
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+
+
+def keyset_page(query, sort_col, id_col, descending: bool, limit: int, cursor: str | None = None,
+                nullable: bool = True):
+    """Fetch one page of ``query`` ordered by ``(sort_col, id_col)``.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    ``query`` must not already be ordered or limited.
+    """
+    after_value, after_id = decode_cursor(cursor) if cursor else (None, None)
+    in_null_segment = cursor is not None and after_value is None
+
+    def before(col, value):
+        return col < value if descending else col > value
+
+    def ordered(q, *cols):
+        return q.order_by(*[c.desc() if descending else c.asc() for c in cols])
+
+    rows = []
+    if not in_null_segment:
+        q = query.filter(sort_col.isnot(None)) if nullable else query
+        if cursor:
+            q = q.filter(or_(before(sort_col, after_value),
+                             and_(sort_col == after_value, before(id_col, after_id))))
+        rows = ordered(q, sort_col, id_col).limit(limit + 1).all()
+
+    if nullable and len(rows) <= limit:
+        q = query.filter(sort_col.is_(None))
+        if in_null_segment:
+            q = q.filter(before(id_col, after_id))
+        rows += ordered(q, id_col).limit(limit + 1 - len(rows)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
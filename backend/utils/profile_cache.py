@@ -0,0 +1,65 @@
+"""
+Memoization of Gemini profile generation.
+
+A profile generated from an identical prompt by the same model is reused
+instead of paying for another multi-second, rate-limited LLM round trip.
+Entries expire after a TTL and the table is trimmed least-recently-used
+first once it holds more than the configured number of rows.
+"""
+import hashlib
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ProfileGenerationCache
+
+
+def cache_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+def lookup(model: str, prompt: str, ttl_seconds: int) -> dict | None:
+    """Return the cached profile for ``(model, prompt)`` if it has not expired."""
+    entry = db.session.get(ProfileGenerationCache, cache_key(model, prompt))
+    if entry is None:
+        return None
+    if ttl_seconds and entry.created_at and entry.created_at < datetime.utcnow() - timedelta(seconds=ttl_seconds):
+        db.session.delete(entry)
+        db.session.commit()
+        return None
+    entry.hits = (entry.hits or 0) + 1
+    entry.last_used_at = datetime.utcnow()
+    db.session.commit()
+    return entry.profile_json
+
+
+def store(model: str, prompt: str, profile_json: dict):
+    key = cache_key(model, prompt)
+    try:
+        entry = db.session.get(ProfileGenerationCache, key)
+        if entry is None:
+            entry = ProfileGenerationCache(cache_key=key, model=model)
+            db.session.add(entry)
+        entry.profile_json = profile_json
+        entry.created_at = datetime.utcnow()
+        entry.last_used_at = entry.created_at
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+
+def evict(ttl_seconds: int, max_entries: int):
+    """Delete expired rows, then the least recently used rows beyond ``max_entries``."""
+    if ttl_seconds:
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+        ProfileGenerationCache.query.filter(ProfileGenerationCache.created_at < cutoff) \
+            .delete(synchronize_session=False)
+    if max_entries:
+        # Rows past the newest ``max_entries`` by last use
+        boundary = db.session.query(ProfileGenerationCache.last_used_at) \
+            .order_by(ProfileGenerationCache.last_used_at.desc()) \
+            .offset(max_entries).limit(1).scalar()
+        if boundary is not None:
+            ProfileGenerationCache.query.filter(ProfileGenerationCache.last_used_at <= boundary) \
+                .delete(synchronize_session=False)
+    db.session.commit()
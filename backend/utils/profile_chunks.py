@@ -0,0 +1,111 @@
+"""
+Splitting and merging for map-reduce profile generation.
+
+A student's combined document text can exceed the model context. The text is
+split into token-budgeted chunks, each chunk is turned into a partial profile
+independently (and concurrently), and the partials are merged back into the
+profile schema. Token counts are estimated (about four characters per token)
+so no tokenizer dependency is needed.
+"""
+import re
+
+PROFILE_LIST_FIELDS = ('skills', 'certifications', 'achievements')
+PROFILE_TEXT_FIELDS = ('name', 'email', 'education', 'summary')
+
+CHARS_PER_TOKEN = 4
+
+# Preferred break points, strongest first: blank line, line end, sentence end, any space
+_BREAKS = (re.compile(r'\n\s*\n'), re.compile(r'\n'), re.compile(r'[.!?]\s'), re.compile(r'\s'))
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_chunks(text: str, max_tokens: int, overlap_tokens: int = 0, max_chunks: int = 0) -> list:
+    """Split ``text`` into chunks of at most ``max_tokens`` (estimated).
+
+    Chunks end at the strongest break point in their last quarter and the
+    next chunk repeats the final ``overlap_tokens`` so a sentence cut at a
+    boundary is still seen whole once. With ``max_chunks`` the budget is
+    raised so the text never yields more chunks than that.
+    """
+    text = text.strip()
+    if max_chunks:
+        max_tokens = max(max_tokens, -(-estimate_tokens(text) // max_chunks) + overlap_tokens)
+    size = max_tokens * CHARS_PER_TOKEN
+    overlap = min(overlap_tokens * CHARS_PER_TOKEN, size // 4)
+    if len(text) <= size:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + size
+        if end >= len(text):
+            chunks.append(text[start:])
+            break
+        window = text[start + size * 3 // 4:end]
+        for pattern in _BREAKS:
+            matches = list(pattern.finditer(window))
+            if matches:
+                end = start + size * 3 // 4 + matches[-1].end()
+                break
+        chunks.append(text[start:end].strip())
+        start = max(end - overlap, start + 1)
+    return [c for c in chunks if c]
+
+
+def _as_list(value) -> list:
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        return [v.strip() for v in re.split(r'[;\n]|,\s', value) if v.strip()]
+    return [value]
+
+
+def _key(value) -> str:
+    return re.sub(r'\s+', ' ', str(value)).strip().lower()
+
+
+def merge_partial_profiles(partials: list) -> dict:
+    """Combine partial profiles (one per chunk) into the profile schema.
+
+    List fields are unioned in first-seen order without case-insensitive
+    duplicates; name and email take the most common non-empty value;
+    education entries and summaries are concatenated without repeats.
+    """
+    merged = {}
+    for field in PROFILE_LIST_FIELDS:
+        seen = set()
+        merged[field] = []
+        for partial in partials:
+            for item in _as_list(partial.get(field)):
+                k = _key(item)
+                if k and k not in seen:
+                    seen.add(k)
+                    merged[field].append(item)
+
+    for field in ('name', 'email'):
+        counts = {}
+        for partial in partials:
+            value = partial.get(field)
+            if isinstance(value, str) and value.strip():
+                counts.setdefault(_key(value), [0, value.strip()])[0] += 1
+        merged[field] = max(counts.values(), key=lambda c: c[0])[1] if counts else ''
+
+    for field, sep in (('education', '; '), ('summary', ' ')):
+        seen = set()
+        parts = []
+        for partial in partials:
+            value = partial.get(field)
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, dict):
+                    item = ', '.join(str(v) for v in item.values() if v)
+                if isinstance(item, str) and item.strip() and _key(item) not in seen:
+                    seen.add(_key(item))
+                    parts.append(item.strip())
+        merged[field] = sep.join(parts)
+    return merged
@@ -0,0 +1,88 @@
+"""
+Parsing of model replies into profile dicts.
+
+``parse_profile_reply`` handles a complete reply (optionally wrapped in a
+```json fence, or with prose around the object). ``ProfileFieldParser`` is
+its incremental counterpart for streamed replies: fed text as it arrives, it
+returns each top-level field of the JSON object as soon as that field's
+value is complete, so clients can show the summary or skills before the
+model has finished the rest.
+"""
+import re
+import json
+
+
+def parse_profile_reply(raw: str) -> dict:
+    """Return the JSON object in ``raw``; raises ``ValueError`` if there is none."""
+    # Extract JSON block if wrapped in code fences
+    fence_match = re.search(r"```json\s*([\s\S]*?)\s*```", raw, re.IGNORECASE)
+    raw_json = (fence_match.group(1) if fence_match else raw).strip()
+    try:
+        parsed = json.loads(raw_json)
+    except ValueError:
+        # Try to find the first { ... } JSON object in the text
+        obj_match = re.search(r"\{[\s\S]*\}", raw_json)
+        if not obj_match:
+            raise ValueError('no JSON object in model reply')
+        parsed = json.loads(obj_match.group(0))
+    if not isinstance(parsed, dict):
+        raise ValueError('model reply is not a JSON object')
+    return parsed
+
+
+class ProfileFieldParser:
+    """Incrementally scans a streamed reply for completed top-level JSON members."""
+
+    def __init__(self):
+        self.text = ''
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = None
+
+    def feed(self, piece: str) -> list:
+        """Add ``piece``; return ``(key, value)`` for every member completed by it."""
+        self.text += piece
+        completed = []
+        text = self.text
+        while self._pos < len(text) and not self.done:
+            ch = text[self._pos]
+            self._pos += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if self._depth == 0:
+                # Skip fences and prose until the object opens
+                if ch == '{':
+                    self._depth = 1
+                    self._member_start = self._pos
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._close_member(self._pos - 1))
+                    self.done = True
+            elif ch == ',' and self._depth == 1:
+                completed.extend(self._close_member(self._pos - 1))
+                self._member_start = self._pos
+        return completed
+
+    def _close_member(self, end: int) -> list:
+        member = self.text[self._member_start:end].strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads('{' + member + '}').items())
+        except ValueError:
+            return []
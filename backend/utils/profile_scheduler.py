@@ -0,0 +1,120 @@
+"""
+Per-user debounced scheduling of profile regeneration.
+
+Dropping several files at once used to trigger one full LLM generation per
+upload. Requests for the same user that arrive within a short window are
+collapsed into a single run on the job queue, and a per-user lock ensures
+two generations for the same user never run at the same time.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+
+
+class ProfileScheduler:
+    """Coalesces profile refresh requests per user and runs them on the job queue.
+
+    ``runner(user_id, new_document_ids)`` does the actual work;
+    ``new_document_ids`` is None when a full rebuild was requested.
+    """
+
+    def __init__(self, app=None, runner=None, window: float = 3.0, max_delay: float = 30.0):
+        self._runner = runner
+        self.window = window
+        self.max_delay = max_delay
+        self._state = {}
+        self._user_locks = {}
+        self._lock = threading.Lock()
+        self._job_queue = None
+        if app is not None:
+            self.init_app(app, runner)
+
+    def init_app(self, app, runner=None):
+        if runner is not None:
+            self._runner = runner
+        self.window = float(app.config.get('PROFILE_DEBOUNCE_SECONDS', self.window))
+        self.max_delay = float(app.config.get('PROFILE_DEBOUNCE_MAX_SECONDS', self.max_delay))
+        self._job_queue = app.extensions['job_queue']
+        app.extensions['profile_scheduler'] = self
+
+    def request(self, user_id: int, document_id: int | None = None, full: bool = False):
+        """Ask for a profile refresh; ``document_id`` names a newly processed upload."""
+        with self._lock:
+            st = self._state.get(user_id)
+            if st is None:
+                st = {'doc_ids': set(), 'full': False, 'timer': None, 'running': False, 'first': None}
+                self._state[user_id] = st
+            if document_id is not None and not full:
+                st['doc_ids'].add(document_id)
+            else:
+                st['full'] = True
+            if st['first'] is None:
+                st['first'] = time.monotonic()
+            if not st['running']:
+                # Otherwise picked up when the current run finishes
+                self._arm(user_id, st)
+
+    def pending(self) -> int:
+        """Number of users with a refresh waiting or running."""
+        with self._lock:
+            return len(self._state)
+
+    @contextmanager
+    def user_lock(self, user_id: int):
+        """Hold the per-user generation lock (also taken by synchronous regenerate paths)."""
+        with self._lock:
+            lock = self._user_locks.setdefault(user_id, threading.Lock())
+        with lock:
+            yield
+
+    def _arm(self, user_id: int, st: dict):
+        if st['timer'] is not None:
+            st['timer'].cancel()
+        waited = time.monotonic() - st['first']
+        delay = max(0.0, min(self.window, self.max_delay - waited))
+        timer = threading.Timer(delay, self._fire, (user_id,))
+        timer.daemon = True
+        st['timer'] = timer
+        timer.start()
+
+    def _fire(self, user_id: int):
+        with self._lock:
+            st = self._state.get(user_id)
+            if st is None or st['running']:
+                return
+            st['timer'] = None
+            st['running'] = True
+            doc_ids = None if st['full'] else sorted(st['doc_ids'])
+            st['doc_ids'] = set()
+            st['full'] = False
+            st['first'] = None
+        try:
+            self._job_queue.enqueue(f'refresh-profile-{user_id}', self._run, user_id, doc_ids)
+        except Exception as e:
+            print(f"Warning: could not queue profile refresh for user {user_id}: {str(e)}")
+            with self._lock:
+                self._state.pop(user_id, None)
+
+    def _run(self, user_id: int, doc_ids):
+        try:
+            with self.user_lock(user_id):
+                self._runner(user_id, doc_ids)
+        finally:
+            with self._lock:
+                st = self._state[user_id]
+                st['running'] = False
+                if st['doc_ids'] or st['full']:
+                    self._arm(user_id, st)
+                else:
+                    del self._state[user_id]
+
+
+def get_profile_scheduler() -> ProfileScheduler:
+    return current_app.extensions['profile_scheduler']
+
+
+def schedule_profile_refresh(user_id: int, document_id: int | None = None, full: bool = False):
+    """Queue a debounced profile refresh for ``user_id`` on the current app."""
+    get_profile_scheduler().request(user_id, document_id=document_id, full=full)
@@ -0,0 +1,35 @@
+"""
+``fields=`` / ``include=`` projection for list endpoints.
+
+``fields=id,filename,status`` returns exactly those fields;
+``include=extracted_text`` adds optional fields to the defaults. Only the
+requested columns are loaded, so large columns such as
+``Document.extracted_text`` (deferred on the model) are neither read from
+the database nor serialized unless asked for.
+"""
+from sqlalchemy.orm import load_only
+
+
+class ProjectionError(ValueError):
+    pass
+
+
+def _split(value: str | None) -> list:
+    return [f.strip() for f in (value or '').split(',') if f.strip()]
+
+
+def parse_projection(args, all_fields: tuple, default_fields: tuple) -> tuple:
+    """Resolve the ``fields``/``include`` query args into an ordered tuple of field names."""
+    fields = _split(args.get('fields'))
+    include = _split(args.get('include'))
+    unknown = [f for f in fields + include if f not in all_fields]
+    if unknown:
+        raise ProjectionError(f"Unknown field(s): {', '.join(unknown)}")
+    selected = set(fields or default_fields) | set(include) | {'id'}
+    return tuple(f for f in all_fields if f in selected)
+
+
+def load_columns(model, fields, *always):
+    """``load_only`` option for ``fields`` plus any columns the caller needs internally."""
+    names = dict.fromkeys(('id',) + tuple(fields) + always)
+    return load_only(*[getattr(model, name) for name in names])
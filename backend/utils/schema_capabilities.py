@@ -0,0 +1,69 @@
+"""
+Schema capability registry.
+
+Some deployments have not applied every migration (e.g. the versioned
+profile pointer ``user_profile.current_version``). Instead of asking
+INFORMATION_SCHEMA on every request — slow, and it takes metadata locks on
+MySQL — the schema is probed once at startup and routes branch on the cached
+flags. Call ``refresh()`` (or POST /api/admin/schema/refresh) after applying
+migrations to a running server.
+"""
+import threading
+
+from flask import current_app
+from sqlalchemy import inspect
+
+# flag -> (table, columns that must all exist)
+CAPABILITIES = {
+    'versioned_profiles': [('user_profile', ['current_version']), ('profile_versions', ['version', 'profile_json'])],
+}
+
+
+class SchemaCapabilities:
+    def __init__(self, app=None, db=None):
+        self._db = db
+        self._flags = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self._db = db
+        app.extensions['schema_capabilities'] = self
+
+    def refresh(self) -> dict:
+        """Probe the database once and cache every flag. Needs an app context."""
+        inspector = inspect(self._db.engine)
+        columns = {}
+        flags = {}
+        for flag, requirements in CAPABILITIES.items():
+            ok = True
+            for table, required in requirements:
+                if table not in columns:
+                    try:
+                        columns[table] = {c['name'] for c in inspector.get_columns(table)}
+                    except Exception:
+                        columns[table] = set()
+                if not set(required) <= columns[table]:
+                    ok = False
+                    break
+            flags[flag] = ok
+        with self._lock:
+            self._flags = flags
+        print(f"Schema capabilities: {', '.join(f'{k}={v}' for k, v in sorted(flags.items()))}")
+        return dict(flags)
+
+    def has(self, flag: str) -> bool:
+        return self._flags.get(flag, False)
+
+    def as_dict(self) -> dict:
+        return dict(self._flags)
+
+
+def get_schema_capabilities() -> SchemaCapabilities:
+    return current_app.extensions['schema_capabilities']
+
+
+def schema_supports(flag: str) -> bool:
+    """In-memory check of a capability probed at startup."""
+    return get_schema_capabilities().has(flag)
@@ -0,0 +1,173 @@
+"""
+Full-text search over document text.
+
+MySQL uses the ``FULLTEXT`` index added by
+``migrations/2026_10_16_document_search.sql`` (kept current by InnoDB on
+every insert/update/delete). SQLite, used for local development, gets an
+FTS5 table over ``documents`` that triggers keep in sync. Either way a query
+is an index lookup ranked by relevance, never a scan of ``extracted_text``.
+"""
+import re
+import html
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from models import db, Document
+
+SNIPPET_CHARS = 160
+# Sentinels marking matches before the snippet is HTML-escaped
+_HL_START, _HL_END = '\x02', '\x03'
+# InnoDB ignores tokens shorter than innodb_ft_min_token_size (3 by default)
+_MYSQL_MIN_TOKEN = 3
+
+_FTS5_SETUP = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+    "filename, extracted_text, content='documents', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN "
+    "INSERT INTO documents_fts(rowid, filename, extracted_text) VALUES (new.id, new.filename, new.extracted_text); END",
+    "CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN "
+    "INSERT INTO documents_fts(documents_fts, rowid, filename, extracted_text) "
+    "VALUES ('delete', old.id, old.filename, old.extracted_text); END",
+    "CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE OF filename, extracted_text ON documents BEGIN "
+    "INSERT INTO documents_fts(documents_fts, rowid, filename, extracted_text) "
+    "VALUES ('delete', old.id, old.filename, old.extracted_text); "
+    "INSERT INTO documents_fts(rowid, filename, extracted_text) VALUES (new.id, new.filename, new.extracted_text); END",
+]
+
+
+class SearchUnavailable(Exception):
+    """Raised when the database has no usable full-text index."""
+
+
+def _dialect() -> str:
+    return db.engine.dialect.name
+
+
+def parse_query(q: str) -> list:
+    """Split user input into terms; ``"quoted text"`` stays together as a phrase."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', q or ''):
+        words = re.findall(r'\w+', phrase or word)
+        if words:
+            terms.append(words)
+    return terms
+
+
+def init_search_index():
+    """Create the SQLite FTS5 table and triggers (no-op on MySQL). Needs an app context."""
+    if _dialect() != 'sqlite':
+        return
+    try:
+        conn = db.session.connection()
+        existed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'")
+        ).first()
+        for stmt in _FTS5_SETUP:
+            conn.execute(text(stmt))
+        if not existed:
+            conn.execute(text("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')"))
+        db.session.commit()
+    except OperationalError as e:
+        db.session.rollback()
+        print(f"Warning: full-text search disabled (FTS5 unavailable): {str(e)}")
+
+
+def rebuild_search_index():
+    """Rebuild the full-text index from ``documents``."""
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        db.session.execute(text("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')"))
+    elif dialect == 'mysql':
+        db.session.execute(text("OPTIMIZE TABLE documents"))
+    db.session.commit()
+
+
+def _highlight(snippet: str) -> str:
+    escaped = html.escape(snippet)
+    return escaped.replace(_HL_START, '<mark>').replace(_HL_END, '</mark>')
+
+
+def make_snippet(body: str | None, terms: list, width: int = SNIPPET_CHARS) -> str:
+    """Cut a window of ``body`` around the first match and mark every matched term."""
+    if not body:
+        return ''
+    words = sorted({w for t in terms for w in t}, key=len, reverse=True)
+    if not words:
+        return html.escape(body[:width])
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(w) for w in words) + r')', re.IGNORECASE)
+    first = pattern.search(body)
+    start = max(0, (first.start() if first else 0) - width // 3)
+    window = body[start:start + width]
+    marked = pattern.sub(lambda m: _HL_START + m.group(0) + _HL_END, window)
+    marked = ' '.join(marked.split())
+    return ('…' if start > 0 else '') + _highlight(marked) + ('…' if start + width < len(body) else '')
+
+
+def _search_sqlite(terms: list, user_id: int | None, limit: int, offset: int) -> list:
+    match = ' '.join('"' + ' '.join(t) + '"' for t in terms)
+    sql = (
+        "SELECT d.id, d.user_id, d.filename, d.status, d.uploaded_at, bm25(documents_fts) AS score, "
+        f"snippet(documents_fts, -1, '{_HL_START}', '{_HL_END}', '…', 24) AS snippet "
+        "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+        "WHERE documents_fts MATCH :match"
+        + (" AND d.user_id = :uid" if user_id is not None else "")
+        + " ORDER BY score, d.id LIMIT :limit OFFSET :offset"
+    )
+    try:
+        rows = db.session.execute(text(sql), {'match': match, 'uid': user_id, 'limit': limit, 'offset': offset}).mappings().all()
+    except OperationalError as e:
+        db.session.rollback()
+        raise SearchUnavailable(str(e))
+    # bm25() is lower-is-better; expose higher-is-better like MySQL
+    return [dict(r, score=-r['score'], snippet=_highlight(' '.join((r['snippet'] or '').split()))) for r in rows]
+
+
+def _search_mysql(terms: list, user_id: int | None, limit: int, offset: int) -> list:
+    parts = []
+    for t in terms:
+        words = [w for w in t if len(w) >= _MYSQL_MIN_TOKEN]
+        if words:
+            parts.append('+"' + ' '.join(words) + '"' if len(words) > 1 else '+' + words[0])
+    if not parts:
+        return []
+    sql = (
+        "SELECT id, user_id, filename, status, uploaded_at, "
+        "MATCH(filename, extracted_text) AGAINST (:q IN BOOLEAN MODE) AS score "
+        "FROM documents WHERE MATCH(filename, extracted_text) AGAINST (:q IN BOOLEAN MODE)"
+        + (" AND user_id = :uid" if user_id is not None else "")
+        + " ORDER BY score DESC, id LIMIT :limit OFFSET :offset"
+    )
+    try:
+        rows = db.session.execute(text(sql), {'q': ' '.join(parts), 'uid': user_id, 'limit': limit, 'offset': offset}).mappings().all()
+    except (OperationalError, ProgrammingError) as e:
+        db.session.rollback()
+        raise SearchUnavailable(str(e))
+    hits = [dict(r) for r in rows]
+    if hits:
+        # Snippets only for the page being returned
+        bodies = dict(db.session.query(Document.id, Document.extracted_text)
+                      .filter(Document.id.in_([h['id'] for h in hits])).all())
+        for h in hits:
+            h['snippet'] = make_snippet(bodies.get(h['id']), terms)
+    return hits
+
+
+def search_documents(q: str, user_id: int | None = None, limit: int = 20, offset: int = 0):
+    """Ranked full-text search; returns ``(hits, has_more)``.
+
+    Each hit has ``id``, ``user_id``, ``filename``, ``status``, ``uploaded_at``,
+    ``score`` (higher is better) and an HTML-escaped ``snippet`` with matches
+    wrapped in ``<mark>``.
+    """
+    terms = parse_query(q)
+    if not terms:
+        return [], False
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        hits = _search_sqlite(terms, user_id, limit + 1, offset)
+    elif dialect == 'mysql':
+        hits = _search_mysql(terms, user_id, limit + 1, offset)
+    else:
+        raise SearchUnavailable(f'Full-text search is not supported on {dialect}')
+    return hits[:limit], len(hits) > limit
@@ -0,0 +1,124 @@
+"""
+Opt-in per-request SQL profiler.
+
+Engine events time every statement executed while a request is being
+handled. At the end of the request the profiler knows the query count, the
+total DB time and the slowest statements, and flags statement shapes that
+repeat (the usual sign of an N+1 loop). Requests over the configured
+thresholds are logged; with ``SQL_PROFILER_HEADER`` (defaults to debug mode)
+the summary is also returned in an ``X-SQL-Profile`` response header.
+"""
+import re
+import time
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+_WS = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so calls differing only in parameters compare equal."""
+    shape = _WS.sub(' ', statement).strip()
+    shape = _STRING.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    return _PLACEHOLDER_LIST.sub('(?, ...)', shape)
+
+
+class SQLProfiler:
+    def __init__(self, app=None, db=None):
+        self.slow_request_ms = 500.0
+        self.slow_query_ms = 100.0
+        self.max_queries = 30
+        self.repeat_threshold = 5
+        self.header = False
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.extensions['sql_profiler'] = self
+        if not app.config.get('SQL_PROFILER_ENABLED'):
+            return
+        self.slow_request_ms = float(app.config.get('SQL_PROFILER_SLOW_REQUEST_MS', self.slow_request_ms))
+        self.slow_query_ms = float(app.config.get('SQL_PROFILER_SLOW_QUERY_MS', self.slow_query_ms))
+        self.max_queries = int(app.config.get('SQL_PROFILER_MAX_QUERIES', self.max_queries))
+        self.repeat_threshold = int(app.config.get('SQL_PROFILER_REPEAT_THRESHOLD', self.repeat_threshold))
+        header = app.config.get('SQL_PROFILER_HEADER')
+        self.header = app.debug if header is None else header
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    # -- engine events ---------------------------------------------------
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_profiler_start', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_profiler_start')
+        if not starts:
+            return
+        took = (time.perf_counter() - starts.pop()) * 1000
+        # Only statements issued by the request thread (jobs have their own app context)
+        if not has_request_context():
+            return
+        profile = g.get('_sql_profile')
+        if profile is not None:
+            profile['queries'].append((statement, took))
+
+    # -- request hooks ---------------------------------------------------
+
+    def _start(self):
+        g._sql_profile = {'queries': [], 'started': time.perf_counter()}
+
+    def summarize(self, profile: dict) -> dict:
+        queries = profile['queries']
+        shapes = {}
+        for statement, took in queries:
+            entry = shapes.setdefault(statement_shape(statement), [0, 0.0])
+            entry[0] += 1
+            entry[1] += took
+        repeated = sorted(
+            ((shape, n, ms) for shape, (n, ms) in shapes.items() if n >= self.repeat_threshold),
+            key=lambda r: r[1], reverse=True,
+        )
+        slowest = sorted(queries, key=lambda q: q[1], reverse=True)[:3]
+        return {
+            'queries': len(queries),
+            'db_ms': sum(t for _, t in queries),
+            'request_ms': (time.perf_counter() - profile['started']) * 1000,
+            'slowest': [(statement_shape(s), t) for s, t in slowest],
+            'n_plus_one': repeated,
+        }
+
+    def _finish(self, response):
+        profile = g.pop('_sql_profile', None)
+        if profile is None:
+            return response
+        summary = self.summarize(profile)
+        slow_query = summary['slowest'] and summary['slowest'][0][1] >= self.slow_query_ms
+        if (summary['request_ms'] >= self.slow_request_ms or summary['queries'] > self.max_queries
+                or summary['n_plus_one'] or slow_query):
+            self._log(summary)
+        if self.header:
+            response.headers['X-SQL-Profile'] = (
+                f"queries={summary['queries']}; db_ms={summary['db_ms']:.1f}; "
+                f"slowest_ms={summary['slowest'][0][1] if summary['slowest'] else 0:.1f}; "
+                f"n_plus_one={len(summary['n_plus_one'])}"
+            )
+        return response
+
+    def _log(self, summary: dict):
+        print(f"SQL profile: {request.method} {request.path} took {summary['request_ms']:.1f} ms, "
+              f"{summary['queries']} queries, {summary['db_ms']:.1f} ms in DB")
+        for shape, took in summary['slowest']:
+            print(f"  {'slow' if took >= self.slow_query_ms else 'top'}: {took:.1f} ms  {shape[:300]}")
+        for shape, n, took in summary['n_plus_one']:
+            print(f"  possible N+1: {n}x ({took:.1f} ms total)  {shape[:300]}")
@@ -0,0 +1,170 @@
+"""
+Content-addressed storage for uploaded files.
+
+Blobs live under ``UPLOAD_FOLDER/blobs/<aa>/<sha256>`` and are named by the
+SHA-256 of their bytes, which is computed while the upload streams to disk.
+Identical files are therefore stored once no matter how often, or under
+which names, they are uploaded.
+
+Because a blob can be shared, deleting one document removes the file only
+when no other row references the hash. ``commit_blob`` reserves the hash
+until the uploader's ``Document`` row is committed (``release_blob``), and
+the reference check and removal run under the same lock as ``commit_blob``,
+so a concurrent upload of the same bytes never ends up pointing at a file
+that was just deleted. Reservations are per process; a reservation that is
+never released expires after ``RESERVATION_TTL`` seconds.
+"""
+import os
+import time
+import hashlib
+import tempfile
+import threading
+
+from flask import send_from_directory
+
+BLOB_DIR = 'blobs'
+TMP_DIR = 'tmp'
+CHUNK_SIZE = 1024 * 1024
+RESERVATION_TTL = 600
+
+_blob_lock = threading.Lock()
+_reservations = {}  # content_hash -> (count, last reserved at)
+
+
+def blob_relpath(content_hash: str) -> str:
+    """Path of a blob relative to the upload folder (what ``Document.filepath`` stores)."""
+    return '/'.join([BLOB_DIR, content_hash[:2], content_hash])
+
+
+def stored_relpath(filepath: str) -> str:
+    """Normalize a ``Document.filepath`` value to a path relative to the upload folder.
+
+    Rows created before content addressing store ``{user_id}_{filename}`` (or
+    an absolute path), which lives directly in the upload folder.
+    """
+    normalized = filepath.replace('\\', '/')
+    if normalized.startswith(BLOB_DIR + '/'):
+        return normalized
+    return os.path.basename(normalized)
+
+
+def resolve_path(upload_dir: str, filepath: str) -> str:
+    """Absolute path on disk for a ``Document.filepath`` value."""
+    return os.path.join(upload_dir, *stored_relpath(filepath).split('/'))
+
+
+def save_stream(stream, upload_dir: str):
+    """Stream ``stream`` into the blob store.
+
+    Returns ``(content_hash, size_bytes, relpath)``. The bytes are written to a
+    temp file while being hashed, then atomically moved into place; if a blob
+    with the same hash already exists the temp file is discarded.
+    """
+    tmp_dir = os.path.join(upload_dir, TMP_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        content_hash = digest.hexdigest()
+        return content_hash, size, commit_blob(tmp_path, content_hash, upload_dir)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def commit_blob(tmp_path: str, content_hash: str, upload_dir: str) -> str:
+    """Move a fully written temp file into the blob store; returns its relpath.
+
+    The hash stays reserved against removal until ``release_blob`` is called.
+    """
+    relpath = blob_relpath(content_hash)
+    final_path = resolve_path(upload_dir, relpath)
+    with _blob_lock:
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+        count, _ = _reservations.get(content_hash, (0, 0))
+        _reservations[content_hash] = (count + 1, time.monotonic())
+    return relpath
+
+
+def release_blob(content_hash: str):
+    """Drop one reservation taken by ``commit_blob`` (the referencing row is saved or abandoned)."""
+    with _blob_lock:
+        count, reserved_at = _reservations.get(content_hash, (0, 0))
+        if count <= 1:
+            _reservations.pop(content_hash, None)
+        else:
+            _reservations[content_hash] = (count - 1, reserved_at)
+
+
+def remove_unreferenced_blob(upload_dir: str, filepath: str, content_hash: str | None, is_referenced) -> bool:
+    """Delete a stored file unless ``is_referenced()`` or an upload of the same bytes is in flight.
+
+    Returns True if the file was removed.
+    """
+    with _blob_lock:
+        if content_hash:
+            count, reserved_at = _reservations.get(content_hash, (0, 0))
+            if count and time.monotonic() - reserved_at < RESERVATION_TTL:
+                return False
+        if is_referenced():
+            return False
+        remove_blob(upload_dir, filepath)
+        return True
+
+
+def send_stored_file(upload_dir: str, filepath: str, download_name: str | None = None,
+                     as_attachment: bool = False, max_age: int = 31536000):
+    """Serve a stored file with Range, ETag/304 and zero-copy support.
+
+    Blobs are immutable, so their SHA-256 is a strong ETag and they may be
+    cached for ``max_age``. Legacy ``{user_id}_{filename}`` files can be
+    overwritten and always revalidate. Werkzeug streams the file through
+    ``wsgi.file_wrapper`` (sendfile) when the server provides it, or hands it
+    to the front server when ``USE_X_SENDFILE`` is enabled; ``conditional``
+    enables ``Range``/``206`` and ``If-None-Match``/``304`` handling.
+    """
+    relpath = stored_relpath(filepath)
+    is_blob = relpath.startswith(BLOB_DIR + '/')
+    response = send_from_directory(
+        upload_dir,
+        relpath,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+        etag=relpath.rsplit('/', 1)[-1] if is_blob else True,
+        max_age=max_age if is_blob else 0,
+    )
+    # Advertise range support up front so PDF viewers can fetch pages lazily
+    response.headers.setdefault('Accept-Ranges', 'bytes')
+    # Callers check the session and ownership first: keep responses out of shared caches
+    response.cache_control.private = True
+    response.cache_control.public = False
+    if is_blob:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def remove_blob(upload_dir: str, filepath: str):
+    """Delete a stored file from disk, ignoring files that are already gone."""
+    path = resolve_path(upload_dir, filepath)
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except Exception as e:
+            print(f"Warning: Could not delete physical file {path}: {str(e)}")
@@ -0,0 +1,184 @@
+"""
+Incrementally maintained ``user_stats`` rollup.
+
+Every flush that inserts, deletes or changes the status of a ``Document``,
+adds a ``ProfileVersion`` or creates a ``User`` applies the matching deltas
+to ``user_stats`` in the same transaction, so admin views read precomputed
+counters instead of scanning ``documents`` and ``profile_versions``.
+``rebuild_user_stats`` recomputes everything from the base tables for repair
+(run ``python app.py rebuild-user-stats``).
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, inspect, select, update, insert, delete, func, case, or_
+
+from models import db, User, Document, ProfileVersion, UserStats
+
+_stats = UserStats.__table__
+
+
+def _new_delta():
+    return {'files_total': 0, 'processing': 0, 'failed': 0,
+            'last_upload': None, 'recompute_last_upload': False,
+            'version': 0, 'recompute_version': False}
+
+
+def _status_counts(status):
+    return {'processing': 1 if status == 'processing' else 0,
+            'failed': 1 if status == 'failed' else 0}
+
+
+def _collect_deltas(session):
+    deltas = defaultdict(_new_delta)
+    created_users = set()
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            created_users.add(obj.id)
+        elif isinstance(obj, Document):
+            d = deltas[obj.user_id]
+            d['files_total'] += 1
+            for key, n in _status_counts(obj.status).items():
+                d[key] += n
+            if obj.uploaded_at and (d['last_upload'] is None or obj.uploaded_at > d['last_upload']):
+                d['last_upload'] = obj.uploaded_at
+        elif isinstance(obj, ProfileVersion):
+            d = deltas[obj.user_id]
+            d['version'] = max(d['version'], obj.version or 0)
+
+    for obj in session.deleted:
+        if isinstance(obj, Document):
+            d = deltas[obj.user_id]
+            d['files_total'] -= 1
+            for key, n in _status_counts(obj.status).items():
+                d[key] -= n
+            d['recompute_last_upload'] = True
+        elif isinstance(obj, ProfileVersion):
+            deltas[obj.user_id]['recompute_version'] = True
+
+    for obj in session.dirty:
+        if isinstance(obj, Document) and obj not in session.deleted:
+            history = inspect(obj).attrs.status.history
+            if not history.has_changes():
+                continue
+            d = deltas[obj.user_id]
+            for old in history.deleted:
+                for key, n in _status_counts(old).items():
+                    d[key] -= n
+            for new in history.added:
+                for key, n in _status_counts(new).items():
+                    d[key] += n
+
+    deleted_users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    for uid in deleted_users:
+        deltas.pop(uid, None)
+    return deltas, created_users - deleted_users
+
+
+def _compute(conn, user_ids=None) -> dict:
+    """Compute stats rows from the base tables (optionally for ``user_ids`` only)."""
+    doc_q = select(
+        Document.user_id,
+        func.count(Document.id),
+        func.sum(case((Document.status == 'processing', 1), else_=0)),
+        func.sum(case((Document.status == 'failed', 1), else_=0)),
+        func.max(Document.uploaded_at),
+    ).group_by(Document.user_id)
+    ver_q = select(ProfileVersion.user_id, func.max(ProfileVersion.version)).group_by(ProfileVersion.user_id)
+    user_q = select(User.id)
+    if user_ids is not None:
+        doc_q = doc_q.where(Document.user_id.in_(user_ids))
+        ver_q = ver_q.where(ProfileVersion.user_id.in_(user_ids))
+        user_q = user_q.where(User.id.in_(user_ids))
+
+    rows = {uid: {'user_id': uid, 'files_total': 0, 'processing': 0, 'failed': 0,
+                  'latest_profile_version': 0, 'last_upload': None}
+            for (uid,) in conn.execute(user_q)}
+    for uid, total, processing, failed, last_upload in conn.execute(doc_q):
+        if uid in rows:
+            rows[uid].update(files_total=total or 0, processing=int(processing or 0),
+                             failed=int(failed or 0), last_upload=last_upload)
+    for uid, version in conn.execute(ver_q):
+        if uid in rows:
+            rows[uid]['latest_profile_version'] = version or 0
+    return rows
+
+
+def _apply(session, flush_context):
+    deltas, created_users = _collect_deltas(session)
+    if not deltas and not created_users:
+        return
+    conn = session.connection()
+
+    for uid in created_users:
+        if uid not in deltas:
+            conn.execute(insert(_stats).values(user_id=uid))
+
+    missing = []
+    for uid, d in deltas.items():
+        if uid is None:
+            continue
+        values = {}
+        for key in ('files_total', 'processing', 'failed'):
+            if d[key]:
+                values[key] = _stats.c[key] + d[key]
+        if d['recompute_last_upload']:
+            values['last_upload'] = select(func.max(Document.uploaded_at)) \
+                .where(Document.user_id == uid).scalar_subquery()
+        elif d['last_upload'] is not None:
+            values['last_upload'] = case(
+                (or_(_stats.c.last_upload.is_(None), _stats.c.last_upload < d['last_upload']), d['last_upload']),
+                else_=_stats.c.last_upload,
+            )
+        if d['recompute_version']:
+            values['latest_profile_version'] = select(func.coalesce(func.max(ProfileVersion.version), 0)) \
+                .where(ProfileVersion.user_id == uid).scalar_subquery()
+        elif d['version']:
+            values['latest_profile_version'] = case(
+                (_stats.c.latest_profile_version < d['version'], d['version']),
+                else_=_stats.c.latest_profile_version,
+            )
+        if not values:
+            continue
+        result = conn.execute(update(_stats).where(_stats.c.user_id == uid).values(**values))
+        if result.rowcount == 0:
+            missing.append(uid)
+
+    if missing:
+        # No row yet (user predates the table): compute it from the flushed base tables
+        rows = _compute(conn, missing)
+        if rows:
+            conn.execute(delete(_stats).where(_stats.c.user_id.in_(list(rows))))
+            conn.execute(insert(_stats), list(rows.values()))
+
+
+def init_user_stats():
+    """Register the flush hook that keeps ``user_stats`` in sync (idempotent)."""
+    if not event.contains(db.session, 'after_flush', _apply):
+        event.listen(db.session, 'after_flush', _apply)
+
+
+def get_user_stats(user_ids: list) -> dict:
+    """Return ``{user_id: UserStats}``, computing and storing rows that are missing."""
+    if not user_ids:
+        return {}
+    found = {s.user_id: s for s in UserStats.query.filter(UserStats.user_id.in_(user_ids))}
+    missing = [uid for uid in user_ids if uid not in found]
+    if missing:
+        rebuild_user_stats(missing)
+        found.update({s.user_id: s for s in UserStats.query.filter(UserStats.user_id.in_(missing))})
+    return found
+
+
+def rebuild_user_stats(user_ids: list | None = None) -> int:
+    """Recompute ``user_stats`` from the base tables; returns the number of rows written."""
+    conn = db.session.connection()
+    rows = _compute(conn, user_ids)
+    stmt = delete(_stats)
+    if user_ids is not None:
+        stmt = stmt.where(_stats.c.user_id.in_(user_ids))
+    conn.execute(stmt)
+    if rows:
+        conn.execute(insert(_stats), list(rows.values()))
+    db.session.commit()
+    return len(rows)
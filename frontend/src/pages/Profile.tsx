@@ -166,11 +166,17 @@ const Profile = () => {
   const fetchDocuments = async () => {
     try {
       setLoadingDocs(true);
-      const res = await fetch('/api/documents', {
-        credentials: 'include', // Include cookies for session
-      });
-      const json = await res.json();
-      const docs = json?.data?.documents || [];
+      // The endpoint is cursor-paginated: follow next_cursor until the last page
+      const docs: any[] = [];
+      let cursor: string | null = '';
+      while (cursor !== null) {
+        const res = await fetch(`/api/documents?limit=100&cursor=${encodeURIComponent(cursor)}`, {
+          credentials: 'include', // Include cookies for session
+        });
+        const json = await res.json();
+        docs.push(...(json?.data?.documents || []));
+        cursor = json?.data?.next_cursor || null;
+      }
       setDocuments(docs);
     } finally {
       setLoadingDocs(false);
@@ -433,11 +439,43 @@ const Profile = () => {
                         try {
                           setRegenerating(true);
                           setLoadingProfile(true);
-                          const res = await fetch('/api/profile/regenerate', { method: 'POST', credentials: 'include' });
-                          const json = await res.json();
-                          if (!res.ok || !json.success) throw new Error(json.message || 'Failed to regenerate');
-                          const p = json.data?.profile?.profile_json;
-                          if (p) setAiProfile(p);
+                          const previous = aiProfile;
+                          const res = await fetch('/api/profile/regenerate/stream', { method: 'POST', credentials: 'include' });
+                          if (!res.ok || !res.body) {
+                            const json = await res.json().catch(() => ({}));
+                            throw new Error(json.message || 'Failed to regenerate');
+                          }
+                          // Server-Sent Events: show each profile field as soon as it is complete
+                          const reader = res.body.getReader();
+                          const decoder = new TextDecoder();
+                          let buffer = '';
+                          let streamed: any = null;
+                          let finished = false;
+                          while (!finished) {
+                            const { value, done } = await reader.read();
+                            if (done) break;
+                            buffer += decoder.decode(value, { stream: true });
+                            let sep;
+                            while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                              const raw = buffer.slice(0, sep);
+                              buffer = buffer.slice(sep + 2);
+                              const event = raw.match(/^event: (.*)$/m)?.[1];
+                              const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}');
+                              if (event === 'field') {
+                                streamed = { ...(streamed || {}), [data.key]: data.value };
+                                setAiProfile(streamed);
+                                setLoadingProfile(false);
+                              } else if (event === 'done') {
+                                const p = data.profile?.profile_json;
+                                if (p) setAiProfile(p);
+                                finished = true;
+                              } else if (event === 'error') {
+                                if (streamed) setAiProfile(previous); // nothing was saved
+                                throw new Error(data.message || 'Failed to regenerate');
+                              }
+                            }
+                          }
+                          if (!finished) throw new Error('Connection closed before the profile was saved');
                           toast({ title: 'Profile regenerated' });
                         } catch (e:any) {
                           toast({ title: 'Regenerate failed', description: e?.message || 'Try again later', variant: 'destructive' });